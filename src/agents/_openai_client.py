@@ -0,0 +1,107 @@
+"""
+Process-wide OpenAI clients.
+
+Each OpenAI client owns its own HTTP connection pool, so creating one per agent
+means a fresh TLS handshake per agent and no keep-alive reuse between them.
+Agents call get_client() instead, and all sync LLM traffic shares one pool.
+An async client's pool is bound to the event loop it first runs on, so
+get_async_client() keeps one client per running loop: each asyncio.run()
+gets its own, and calls within it share that client's pool.
+
+API calls go through with_backoff()/with_backoff_async(), which retry rate
+limits, connection errors and 5xx responses with exponential backoff. The
+clients are built with max_retries=0 so that wrapper is the only retry layer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import random
+import threading
+import time
+import weakref
+
+from config.settings import OPENAI_API_KEY
+
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def get_async_client():
+    """The AsyncOpenAI client for the running event loop (call from a coroutine)."""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = _async_clients[loop] = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return client
+
+
+MAX_ATTEMPTS = 5
+
+
+def _retryable_errors() -> tuple:
+    import openai
+
+    # APITimeoutError is a subclass of APIConnectionError
+    return (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def _rejected_errors() -> tuple:
+    import openai
+
+    # The server turned these requests away before acting on them
+    return (openai.RateLimitError,)
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return min(60, 2**attempt) + random.random()
+
+
+def _call_with_retries(retryable: tuple, fn, args, kwargs):
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except retryable:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(_backoff_seconds(attempt))
+
+
+def with_backoff(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs), retrying transient API errors up to MAX_ATTEMPTS times."""
+    return _call_with_retries(_retryable_errors(), fn, args, kwargs)
+
+
+def with_backoff_create(fn, *args, **kwargs):
+    """
+    with_backoff() for requests that create something server-side (uploads, batch jobs).
+
+    Only rate-limit rejections are retried: after a timeout or a 5xx the server
+    may already have accepted the request, and sending it again would create
+    (and bill) a duplicate.
+    """
+    return _call_with_retries(_rejected_errors(), fn, args, kwargs)
+
+
+async def with_backoff_async(fn, *args, **kwargs):
+    """Async with_backoff(): awaits fn(*args, **kwargs) and sleeps without blocking the loop."""
+    retryable = _retryable_errors()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return await fn(*args, **kwargs)
+        except retryable:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(_backoff_seconds(attempt))
@@ -3,33 +3,44 @@ Multi-Account Aggregation Agent (MVP)
 
 Combines multiple CSV transaction files into a single DataFrame with a `source`
 column. This keeps things local and avoids external integrations.
+
+Files are parsed concurrently; pyarrow's multi-threaded CSV reader is used when
+installed, otherwise pandas.
 """
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 import pandas as pd
 
+from utils.helpers import read_csv
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AggregationConfig:
     source_column: str = "source"
+    max_workers: int | None = None  # None -> ThreadPoolExecutor default
 
 
 class AggregationAgent:
     def __init__(self, config: AggregationConfig | None = None):
         self.config = config or AggregationConfig()
 
+    def _read_one(self, path: Path) -> pd.DataFrame | None:
+        try:
+            df = read_csv(path)
+            df[self.config.source_column] = path.stem
+            return df
+        except Exception:
+            return None
+
     def aggregate_csvs(self, csv_paths: list[Path]) -> pd.DataFrame:
-        frames: list[pd.DataFrame] = []
-        for p in csv_paths:
-            try:
-                df = pd.read_csv(p)
-                df[self.config.source_column] = p.stem
-                frames.append(df)
-            except Exception:
-                continue
+        if not csv_paths:
+            return pd.DataFrame()
+        # CSV parsing releases the GIL, so threads overlap I/O and parsing across files.
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as ex:
+            frames = [df for df in ex.map(self._read_one, csv_paths) if df is not None]
         return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
-
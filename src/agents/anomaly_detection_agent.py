@@ -3,10 +3,37 @@ Anomaly Detection Agent
 Detects unusual transactions using statistical methods and pattern analysis.
 """
 
+import re
+
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 
+from utils.helpers import coerce_transactions, map_unique, true_mask
+
+# Generic/unknown merchant names
+SUSPICIOUS_MERCHANT_KEYWORDS = (
+    'unknown', 'payment', 'card transaction', 'square',
+    'transfer', 'pending', 'unidentified'
+)
+_SUSPICIOUS_MERCHANT_RE = re.compile("|".join(re.escape(k) for k in SUSPICIOUS_MERCHANT_KEYWORDS))
+
+# Bit flags for the `reason_mask` column, in detector priority order: the lowest
+# set bit is the detector whose text ended up in `anomaly_reason`.
+REASON_STAT = 1
+REASON_IQR = 2
+REASON_CATEGORY = 4
+REASON_MERCHANT = 8
+REASON_LARGE = 16
+
+_REASON_TYPES = {
+    REASON_STAT: 'Statistical Outlier',
+    REASON_IQR: 'IQR Outlier',
+    REASON_CATEGORY: 'Category Outlier',
+    REASON_MERCHANT: 'Unknown Merchant',
+    REASON_LARGE: 'Large Transaction',
+}
+
 
 class AnomalyDetectionAgent:
     """Detects anomalies in financial transactions using multiple detection methods."""
@@ -30,175 +57,207 @@ class AnomalyDetectionAgent:
             transactions_df: DataFrame with transaction data including 'amount', 'merchant', 'category', 'date'
             
         Returns:
-            DataFrame with added 'is_anomaly' and 'anomaly_reason' columns
+            DataFrame with added 'is_anomaly', 'anomaly_reason', 'anomaly_score'
+            and 'reason_mask' (REASON_* bits of every detector that fired) columns
         """
-        df = transactions_df.copy()
-        
-        # Ensure amount is numeric
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-        
-        # Initialize anomaly columns
-        df['is_anomaly'] = False
-        df['anomaly_reason'] = ''
-        df['anomaly_score'] = 0.0
-        
-        # Apply multiple detection methods
-        self._detect_statistical_outliers(df)
-        self._detect_category_outliers(df)
-        self._detect_unknown_merchants(df)
-        self._detect_unusual_patterns(df)
-        
+        # Shallow copy with numeric amount; anomaly columns are assigned whole at the end
+        df = coerce_transactions(transactions_df, dropna=False, parse_dates=False)
+
+        # Materialize shared inputs once; every detector reads from these
+        amt = df['amount'].to_numpy(dtype=float)
+        sorted_amounts = np.sort(amt[~np.isnan(amt)])
+
+        is_anomaly = np.zeros(len(df), dtype=bool)
+        anomaly_reason = np.full(len(df), '', dtype=object)
+        anomaly_score = np.zeros(len(df), dtype=float)
+        reason_mask = np.zeros(len(df), dtype=np.uint8)
+
+        # Detectors in priority order: the first one to flag a row sets its reason
+        detections = [
+            *self._detect_statistical_outliers(df, amt, sorted_amounts),
+            *self._detect_category_outliers(df, amt),
+            *self._detect_unknown_merchants(df),
+            *self._detect_unusual_patterns(df, amt, sorted_amounts),
+        ]
+        for bit, candidates, scores, reason_fn in detections:
+            reason_mask[np.asarray(candidates, dtype=bool)] |= bit
+            self._flag_rows(is_anomaly, anomaly_reason, anomaly_score, candidates, scores, reason_fn)
+
+        df['is_anomaly'] = is_anomaly
+        df['anomaly_reason'] = anomaly_reason
+        df['anomaly_score'] = anomaly_score
+        df['reason_mask'] = reason_mask
+
         return df
     
-    def _detect_statistical_outliers(self, df: pd.DataFrame):
-        """Detect outliers using Z-score and IQR methods."""
-        if len(df) < 3:  # Need at least 3 transactions for statistical analysis
-            return
-        
-        amounts = df['amount'].dropna()
-        if len(amounts) < 3:
+    @staticmethod
+    def _flag_rows(
+        is_anomaly: np.ndarray,
+        anomaly_reason: np.ndarray,
+        anomaly_score: np.ndarray,
+        candidates: np.ndarray,
+        scores: np.ndarray,
+        reason_fn,
+    ) -> None:
+        """
+        Flag candidate rows that are not already anomalous.
+
+        Args:
+            is_anomaly: Boolean flags (updated in place)
+            anomaly_reason: Object array of reasons (updated in place)
+            anomaly_score: Float scores (updated in place)
+            candidates: Boolean array (one entry per row) of rows matched by a detector
+            scores: Float array (one entry per row) of detector scores
+            reason_fn: Callable mapping an array of row positions to reason strings
+        """
+        mask = np.asarray(candidates, dtype=bool) & ~is_anomaly
+        if not mask.any():
             return
-        
+
+        np.maximum(anomaly_score, scores, out=anomaly_score, where=mask)
+        np.logical_or(is_anomaly, mask, out=is_anomaly)
+        # Reason strings are only formatted for the (usually few) newly flagged rows
+        anomaly_reason[mask] = reason_fn(np.flatnonzero(mask))
+
+    @staticmethod
+    def _sorted_quantile(sorted_values: np.ndarray, q: float) -> float:
+        """Linear-interpolated quantile of an already-sorted array (same as Series.quantile)."""
+        pos = q * (len(sorted_values) - 1)
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, len(sorted_values) - 1)
+        t = pos - lo
+        diff = sorted_values[hi] - sorted_values[lo]
+        # Same lerp form NumPy uses, so results match bit-for-bit
+        return sorted_values[hi] - diff * (1 - t) if t >= 0.5 else sorted_values[lo] + diff * t
+
+    @staticmethod
+    def _sorted_median(sorted_values: np.ndarray) -> float:
+        """Median of an already-sorted array (same as Series.median)."""
+        mid = len(sorted_values) // 2
+        if len(sorted_values) % 2:
+            return sorted_values[mid]
+        return (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+    def _detect_statistical_outliers(self, df: pd.DataFrame, amt: np.ndarray, amounts: np.ndarray):
+        """Detect outliers using Z-score and IQR methods."""
+        if len(df) < 3 or len(amounts) < 3:  # Need at least 3 transactions for statistical analysis
+            return []
+
+        detections = []
+
         # Z-score method
         mean_amount = amounts.mean()
-        std_amount = amounts.std()
+        std_amount = amounts.std(ddof=1)
         
         if std_amount > 0:
-            z_scores = np.abs((df['amount'] - mean_amount) / std_amount)
-            z_outliers = z_scores > self.z_score_threshold
-            
-            for idx in df[z_outliers].index:
-                if not df.at[idx, 'is_anomaly']:
-                    df.at[idx, 'is_anomaly'] = True
-                    df.at[idx, 'anomaly_reason'] = (
-                        f"Statistical outlier: Z-score {z_scores[idx]:.2f} "
-                        f"(amount ${df.at[idx, 'amount']:.2f} vs mean ${mean_amount:.2f})"
-                    )
-                    df.at[idx, 'anomaly_score'] = max(df.at[idx, 'anomaly_score'], z_scores[idx])
+            z_scores = np.abs((amt - mean_amount) / std_amount)
+            detections.append((
+                REASON_STAT,
+                z_scores > self.z_score_threshold,
+                z_scores,
+                lambda pos: [
+                    f"Statistical outlier: Z-score {z:.2f} "
+                    f"(amount ${a:.2f} vs mean ${mean_amount:.2f})"
+                    for z, a in zip(z_scores[pos], amt[pos])
+                ],
+            ))
         
         # IQR method
-        Q1 = amounts.quantile(0.25)
-        Q3 = amounts.quantile(0.75)
+        Q1 = self._sorted_quantile(amounts, 0.25)
+        Q3 = self._sorted_quantile(amounts, 0.75)
         IQR = Q3 - Q1
         
         if IQR > 0:
             lower_bound = Q1 - self.iqr_multiplier * IQR
             upper_bound = Q3 + self.iqr_multiplier * IQR
             
-            iqr_outliers = (df['amount'] < lower_bound) | (df['amount'] > upper_bound)
-            
-            for idx in df[iqr_outliers].index:
-                if not df.at[idx, 'is_anomaly']:
-                    df.at[idx, 'is_anomaly'] = True
-                    reason = (
-                        f"IQR outlier: Amount ${df.at[idx, 'amount']:.2f} "
-                        f"outside range [${lower_bound:.2f}, ${upper_bound:.2f}]"
-                    )
-                    if df.at[idx, 'anomaly_reason']:
-                        df.at[idx, 'anomaly_reason'] += f"; {reason}"
-                    else:
-                        df.at[idx, 'anomaly_reason'] = reason
-                    # Calculate score based on how far outside the bounds
-                    if df.at[idx, 'amount'] > upper_bound:
-                        score = (df.at[idx, 'amount'] - upper_bound) / IQR
-                    else:
-                        score = (lower_bound - df.at[idx, 'amount']) / IQR
-                    df.at[idx, 'anomaly_score'] = max(df.at[idx, 'anomaly_score'], score)
+            # Score based on how far outside the bounds
+            scores = np.where(amt > upper_bound, amt - upper_bound, lower_bound - amt) / IQR
+            detections.append((
+                REASON_IQR,
+                (amt < lower_bound) | (amt > upper_bound),
+                scores,
+                lambda pos: [
+                    f"IQR outlier: Amount ${a:.2f} "
+                    f"outside range [${lower_bound:.2f}, ${upper_bound:.2f}]"
+                    for a in amt[pos]
+                ],
+            ))
+
+        return detections
     
-    def _detect_category_outliers(self, df: pd.DataFrame):
+    def _detect_category_outliers(self, df: pd.DataFrame, amt: np.ndarray):
         """Detect outliers within specific categories."""
         if 'category' not in df.columns:
-            return
+            return []
         
-        for category in df['category'].unique():
-            category_df = df[df['category'] == category]
-            if len(category_df) < 2:  # Need at least 2 transactions in category
-                continue
-            
-            category_amounts = category_df['amount'].dropna()
-            if len(category_amounts) < 2:
-                continue
-            
-            category_mean = category_amounts.mean()
-            category_std = category_amounts.std()
-            
-            if category_std > 0:
-                # Detect transactions significantly above category average
-                threshold = category_mean + 2 * category_std
-                outliers = (category_df['amount'] > threshold) & category_df.index.isin(df.index)
-                
-                for idx in category_df[category_df['amount'] > threshold].index:
-                    if not df.at[idx, 'is_anomaly']:
-                        df.at[idx, 'is_anomaly'] = True
-                        reason = (
-                            f"Category outlier: ${df.at[idx, 'amount']:.2f} in '{category}' "
-                            f"(category avg: ${category_mean:.2f})"
-                        )
-                        if df.at[idx, 'anomaly_reason']:
-                            df.at[idx, 'anomaly_reason'] += f"; {reason}"
-                        else:
-                            df.at[idx, 'anomaly_reason'] = reason
-                        df.at[idx, 'anomaly_score'] = max(
-                            df.at[idx, 'anomaly_score'],
-                            (df.at[idx, 'amount'] - category_mean) / category_std
-                        )
+        # Per-category mean/std broadcast back to each row; categories with
+        # fewer than 2 valid amounts get a NaN std and never match.
+        grouped = df.groupby('category', sort=False)['amount']
+        category_mean = grouped.transform('mean').to_numpy(dtype=float)
+        category_std = grouped.transform('std').to_numpy(dtype=float)
+        categories = df['category'].to_numpy()
+
+        # Detect transactions significantly above category average
+        with np.errstate(divide='ignore', invalid='ignore'):
+            outliers = (category_std > 0) & (amt > category_mean + 2 * category_std)
+            scores = (amt - category_mean) / category_std
+
+        return [(
+            REASON_CATEGORY,
+            outliers,
+            scores,
+            lambda pos: [
+                f"Category outlier: ${a:.2f} in '{c}' (category avg: ${m:.2f})"
+                for a, c, m in zip(amt[pos], categories[pos], category_mean[pos])
+            ],
+        )]
     
     def _detect_unknown_merchants(self, df: pd.DataFrame):
         """Detect transactions from unknown or suspicious merchants."""
         if 'merchant' not in df.columns:
-            return
-        
-        # Flag generic/unknown merchant names
-        suspicious_keywords = [
-            'unknown', 'payment', 'card transaction', 'square', 
-            'transfer', 'pending', 'unidentified'
-        ]
+            return []
         
-        merchant_lower = df['merchant'].astype(str).str.lower()
-        
-        for idx, merchant in merchant_lower.items():
-            if any(keyword in merchant for keyword in suspicious_keywords):
-                if not df.at[idx, 'is_anomaly']:
-                    df.at[idx, 'is_anomaly'] = True
-                    reason = f"Unknown/suspicious merchant: '{df.at[idx, 'merchant']}'"
-                    if df.at[idx, 'anomaly_reason']:
-                        df.at[idx, 'anomaly_reason'] += f"; {reason}"
-                    else:
-                        df.at[idx, 'anomaly_reason'] = reason
-                    df.at[idx, 'anomaly_score'] = max(df.at[idx, 'anomaly_score'], 1.0)
+        # Match against distinct merchant names only, then broadcast back to rows
+        suspicious = map_unique(
+            df['merchant'].astype(str),
+            lambda m: m.str.lower().str.contains(_SUSPICIOUS_MERCHANT_RE, na=False),
+        ).to_numpy(dtype=bool)
+        merchants = df['merchant'].to_numpy()
+
+        return [(
+            REASON_MERCHANT,
+            suspicious,
+            np.ones(len(df)),
+            lambda pos: [f"Unknown/suspicious merchant: '{m}'" for m in merchants[pos]],
+        )]
     
-    def _detect_unusual_patterns(self, df: pd.DataFrame):
+    def _detect_unusual_patterns(self, df: pd.DataFrame, amt: np.ndarray, amounts: np.ndarray):
         """Detect unusual spending patterns."""
-        if 'date' not in df.columns or len(df) < 3:
-            return
+        if 'date' not in df.columns or len(df) < 3 or len(amounts) == 0:
+            return []
         
         # Detect unusually large single transactions
-        amounts = df['amount'].dropna()
-        if len(amounts) > 0:
-            median_amount = amounts.median()
-            # Flag transactions more than 5x the median
-            large_transaction_threshold = median_amount * 5
-            
-            large_transactions = df['amount'] > large_transaction_threshold
-            for idx in df[large_transactions].index:
-                if not df.at[idx, 'is_anomaly']:
-                    df.at[idx, 'is_anomaly'] = True
-                    reason = (
-                        f"Unusually large transaction: ${df.at[idx, 'amount']:.2f} "
-                        f"(>{large_transaction_threshold:.2f}, median: ${median_amount:.2f})"
-                    )
-                    if df.at[idx, 'anomaly_reason']:
-                        df.at[idx, 'anomaly_reason'] += f"; {reason}"
-                    else:
-                        df.at[idx, 'anomaly_reason'] = reason
-                    df.at[idx, 'anomaly_score'] = max(
-                        df.at[idx, 'anomaly_score'],
-                        df.at[idx, 'amount'] / median_amount
-                    )
+        median_amount = self._sorted_median(amounts)
+        # Flag transactions more than 5x the median
+        large_transaction_threshold = median_amount * 5
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = amt / median_amount
+        return [(
+            REASON_LARGE,
+            amt > large_transaction_threshold,
+            scores,
+            lambda pos: [
+                f"Unusually large transaction: ${a:.2f} "
+                f"(>{large_transaction_threshold:.2f}, median: ${median_amount:.2f})"
+                for a in amt[pos]
+            ],
+        )]
     
     def get_anomaly_summary(self, df: pd.DataFrame) -> Dict:
         """Generate summary of detected anomalies."""
-        anomalies = df[df['is_anomaly'] == True]
+        anomalies = df[true_mask(df['is_anomaly'])]
         
         summary = {
             'total_anomalies': len(anomalies),
@@ -207,7 +266,15 @@ class AnomalyDetectionAgent:
             'top_anomalies': []
         }
         
-        if len(anomalies) > 0:
+        if len(anomalies) > 0 and 'reason_mask' in anomalies.columns:
+            # The lowest set bit is the detector that supplied the row's reason
+            masks = anomalies['reason_mask'].to_numpy(dtype=np.int64)
+            codes = masks & -masks
+            codes, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+            for i in np.argsort(first_seen):
+                if codes[i] in _REASON_TYPES:
+                    summary['anomalies_by_type'][_REASON_TYPES[codes[i]]] = int(counts[i])
+        elif len(anomalies) > 0:
             # Categorize by reason type
             for reason in anomalies['anomaly_reason']:
                 if 'Statistical outlier' in reason or 'Z-score' in reason:
@@ -225,7 +292,8 @@ class AnomalyDetectionAgent:
                 elif 'Unusually large' in reason:
                     summary['anomalies_by_type']['Large Transaction'] = \
                         summary['anomalies_by_type'].get('Large Transaction', 0) + 1
-            
+
+        if len(anomalies) > 0:
             # Get top anomalies by score
             top_anomalies = anomalies.nlargest(5, 'anomaly_score')
             summary['top_anomalies'] = top_anomalies[
@@ -236,7 +304,7 @@ class AnomalyDetectionAgent:
     
     def generate_anomaly_report(self, df: pd.DataFrame) -> str:
         """Generate formatted text report of anomalies."""
-        anomalies = df[df['is_anomaly'] == True]
+        anomalies = df[true_mask(df['is_anomaly'])]
         summary = self.get_anomaly_summary(df)
         
         report_lines = [
@@ -302,9 +370,9 @@ class AnomalyDetectionAgent:
             return out
 
         try:
-            from openai import OpenAI
+            from agents._openai_client import get_client, with_backoff
 
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = get_client()
         except Exception:
             return out
 
@@ -327,7 +395,8 @@ class AnomalyDetectionAgent:
                     "Be practical and mention what the user should check. Return plain text only.\n\n"
                     f"Anomaly JSON:\n{payload}"
                 )
-                resp = client.chat.completions.create(
+                resp = with_backoff(
+                    client.chat.completions.create,
                     model=OPENAI_INSIGHTS_MODEL,
                     messages=[{"role": "user", "content": prompt}],
                 )
@@ -12,8 +12,14 @@ from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 
+from utils.helpers import coerce_transactions, map_unique, true_mask
 
-@dataclass(frozen=True)
+
+# Tag mark_recurring() adds; other agents look for it in the tags column
+RECURRING_TAG = "recurring"
+
+
+@dataclass(frozen=True, slots=True)
 class BillDetectionConfig:
     min_occurrences: int = 3
     monthly_min_days: int = 25
@@ -27,17 +33,23 @@ class BillAgent:
 
     @staticmethod
     def _prepare(df: pd.DataFrame) -> pd.DataFrame:
-        out = df.copy()
-        out["amount"] = pd.to_numeric(out.get("amount"), errors="coerce")
-        out["date"] = pd.to_datetime(out.get("date"), errors="coerce")
-        out = out.dropna(subset=["amount", "date"])
+        out = coerce_transactions(df)
         if "merchant_normalized" not in out.columns:
             merchant = out.get("merchant", out.get("description", "")).astype(str)
-            out["merchant_normalized"] = (
-                merchant.str.lower().str.replace(r"[^a-z0-9\\s]", "", regex=True).str.replace(r"\\s+", " ", regex=True).str.strip()
+            out["merchant_normalized"] = map_unique(
+                merchant,
+                lambda m: m.str.lower().str.replace(r"[^a-z0-9\s]", "", regex=True).str.replace(r"\s+", " ", regex=True).str.strip(),
             )
         return out
 
+    @staticmethod
+    def _add_recurring_tag(t: str) -> str:
+        cur = str(t or "")
+        parts = [p for p in cur.split(",") if p]
+        if RECURRING_TAG not in parts:
+            parts.append(RECURRING_TAG)
+        return ",".join(sorted(set(parts)))
+
     def mark_recurring(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
         df = self._prepare(transactions_df)
         if df.empty:
@@ -47,44 +59,38 @@ class BillAgent:
         out["is_recurring"] = False
         out["recurring_group"] = ""
 
+        cfg = self.config
         work = df.sort_values(["merchant_normalized", "date"])
-        for merchant, mdf in work.groupby("merchant_normalized"):
-            if len(mdf) < self.config.min_occurrences:
-                continue
-
-            dates = mdf["date"].sort_values().to_list()
-            amounts = mdf["amount"].astype(float).to_numpy()
-
-            # Check typical amount consistency
-            med = float(np.median(amounts))
-            if med == 0:
-                continue
-            within = np.abs(amounts - med) / abs(med) <= self.config.amount_tolerance
-            if within.mean() < 0.6:
-                continue
-
-            # Check monthly-like cadence (median gap)
-            gaps = [(dates[i] - dates[i - 1]).days for i in range(1, len(dates))]
-            if not gaps:
-                continue
-            gap_med = int(np.median(gaps))
-            if not (self.config.monthly_min_days <= gap_med <= self.config.monthly_max_days):
-                continue
-
-            idx = mdf.index
-            out.loc[idx, "is_recurring"] = True
-            out.loc[idx, "recurring_group"] = f"{merchant}:{round(med, 2)}"
-
-            # Add tag if present
-            if "tags" in out.columns:
-                def _add_tag(t: str) -> str:
-                    cur = str(t or "")
-                    parts = [p for p in cur.split(",") if p]
-                    if "recurring" not in parts:
-                        parts.append("recurring")
-                    return ",".join(sorted(set(parts)))
-
-                out.loc[idx, "tags"] = out.loc[idx, "tags"].apply(_add_tag)
+        key = work["merchant_normalized"]
+        grp = work.groupby(key, sort=False)
+        amounts = work["amount"].astype(float)
+
+        # Check typical amount consistency (per-merchant median, broadcast to rows)
+        med = grp["amount"].transform("median")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            within = (amounts - med).abs() / med.abs() <= cfg.amount_tolerance
+        within_rate = within.groupby(key, sort=False).transform("mean")
+
+        # Check monthly-like cadence (median gap between consecutive dates)
+        gaps = grp["date"].diff().dt.days
+        gap_med = np.trunc(gaps.groupby(key, sort=False).transform("median"))
+
+        recurring = (
+            (grp["amount"].transform("size") >= cfg.min_occurrences)
+            & (med != 0)
+            & (within_rate >= 0.6)
+            & gap_med.between(cfg.monthly_min_days, cfg.monthly_max_days)
+        )
+        if not recurring.any():
+            return out
+
+        idx = work.index[recurring.to_numpy()]
+        out.loc[idx, "is_recurring"] = True
+        out.loc[idx, "recurring_group"] = key[recurring] + ":" + med[recurring].map(lambda m: str(round(float(m), 2)))
+
+        # Add tag if present
+        if "tags" in out.columns:
+            out.loc[idx, "tags"] = out.loc[idx, "tags"].apply(self._add_recurring_tag)
 
         return out
 
@@ -94,27 +100,33 @@ class BillAgent:
             return pd.DataFrame(columns=["merchant", "typical_amount", "typical_day", "last_seen", "next_due"])
 
         if "is_recurring" in df.columns:
-            df = df[df["is_recurring"] == True]  # noqa: E712
+            df = df[true_mask(df["is_recurring"])]
 
         if df.empty:
             return pd.DataFrame(columns=["merchant", "typical_amount", "typical_day", "last_seen", "next_due"])
 
-        rows: list[dict] = []
-        for merchant, mdf in df.sort_values("date").groupby("merchant_normalized"):
-            amounts = mdf["amount"].astype(float).to_numpy()
-            typical_amount = float(np.median(amounts)) if len(amounts) else 0.0
-            typical_day = int(np.median(mdf["date"].dt.day))
-            last_seen = mdf["date"].max().normalize()
-            next_due = (last_seen + pd.Timedelta(days=30)).normalize()
-            rows.append(
-                {
-                    "merchant": merchant,
-                    "typical_amount": round(typical_amount, 2),
-                    "typical_day": typical_day,
-                    "last_seen": last_seen.strftime("%Y-%m-%d"),
-                    "next_due": next_due.strftime("%Y-%m-%d"),
-                }
+        # One grouped aggregation over all recurring merchants (no per-merchant loop)
+        cal = (
+            df.assign(day=df["date"].dt.day)
+            .groupby("merchant_normalized")
+            .agg(
+                typical_amount=("amount", "median"),
+                typical_day=("day", "median"),
+                last_seen=("date", "max"),
             )
-
-        return pd.DataFrame(rows).sort_values(["next_due", "typical_amount"], ascending=[True, False])
+            .reset_index()
+        )
+        last_seen = cal["last_seen"].dt.normalize()
+        next_due = (last_seen + pd.Timedelta(days=30)).dt.normalize()
+
+        out = pd.DataFrame(
+            {
+                "merchant": cal["merchant_normalized"],
+                "typical_amount": [round(float(v), 2) for v in cal["typical_amount"]],
+                "typical_day": np.trunc(cal["typical_day"]).astype(int),
+                "last_seen": last_seen.dt.strftime("%Y-%m-%d"),
+                "next_due": next_due.dt.strftime("%Y-%m-%d"),
+            }
+        )
+        return out.sort_values(["next_due", "typical_amount"], ascending=[True, False])
 
@@ -8,14 +8,18 @@ Budget Agent
 
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from utils.helpers import coerce_transactions
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class BudgetConfig:
     lookback_months: int = 3
     discretionary_categories: tuple[str, ...] = ("Dining", "Entertainment", "Shopping")
@@ -23,25 +27,38 @@ class BudgetConfig:
     essentials_target_multiplier: float = 1.05
 
 
+@functools.lru_cache(maxsize=8)
+def _read_yaml(path: Path, mtime_ns: int) -> dict[str, Any] | None:
+    """Parse a YAML mapping; cached per (path, mtime) so unchanged files are parsed once."""
+    try:
+        import yaml  # type: ignore
+    except Exception:
+        return None
+
+    # Prefer the libyaml-backed C loader when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        raw = path.read_text(encoding="utf-8").strip()
+        if not raw:
+            return None
+        parsed = yaml.load(raw, Loader=loader)
+        return parsed if isinstance(parsed, dict) else None
+    except Exception:
+        return None
+
+
 class BudgetAgent:
     def __init__(self, config: BudgetConfig | None = None):
         self.config = config or BudgetConfig()
+        self._discretionary = frozenset(self.config.discretionary_categories)
 
     @staticmethod
     def _load_yaml(path: Path) -> dict[str, Any] | None:
         try:
-            import yaml  # type: ignore
-        except Exception:
-            return None
-
-        try:
-            raw = path.read_text(encoding="utf-8").strip()
-            if not raw:
-                return None
-            parsed = yaml.safe_load(raw)
-            return parsed if isinstance(parsed, dict) else None
+            mtime_ns = path.stat().st_mtime_ns
         except Exception:
             return None
+        return _read_yaml(path, mtime_ns)
 
     def load_budget_rules(self, path: Path) -> dict[str, float] | None:
         """
@@ -66,35 +83,29 @@ class BudgetAgent:
         return out or None
 
     def generate_smart_budget(self, transactions_df: pd.DataFrame) -> dict[str, Any]:
-        df = transactions_df.copy()
-        df["amount"] = pd.to_numeric(df.get("amount"), errors="coerce")
-        df["date"] = pd.to_datetime(df.get("date"), errors="coerce")
-        df = df.dropna(subset=["amount", "date"])
+        df = coerce_transactions(transactions_df)
         if df.empty:
             return {"budgets": {}, "method": "empty"}
         if "category" not in df.columns:
             df["category"] = "Uncategorized"
 
-        df["year_month"] = df["date"].dt.to_period("M").dt.to_timestamp()
+        # Month buckets as datetime64[M] (integer months) instead of Period objects
+        months = df["date"].to_numpy().astype("datetime64[M]")
+        df["year_month"] = months
         # lookback window
-        last_month = df["year_month"].max()
-        window_start = (last_month - pd.offsets.MonthBegin(self.config.lookback_months)).normalize()
-        window = df[df["year_month"] >= window_start]
+        window_start = months.max() - np.timedelta64(self.config.lookback_months, "M")
+        window = df[months >= window_start]
         if window.empty:
             window = df
 
-        monthly_by_cat = (
-            window.groupby(["category", "year_month"], as_index=False)
-            .agg(total_spent=("amount", "sum"))
-            .sort_values(["category", "year_month"])
-        )
-        avg_by_cat = monthly_by_cat.groupby("category", as_index=False).agg(avg_monthly=("total_spent", "mean"))
+        # Average monthly spend = total / number of months the category had spending,
+        # computed in a single groupby (no intermediate per-month frame).
+        by_cat = window.groupby("category", observed=True).agg(total_spent=("amount", "sum"), months=("year_month", "nunique"))
+        avg_monthly = by_cat["total_spent"] / by_cat["months"]
 
         budgets: dict[str, float] = {}
-        for _, row in avg_by_cat.iterrows():
-            cat = str(row["category"])
-            avg = float(row["avg_monthly"])
-            if cat in self.config.discretionary_categories:
+        for cat, avg in zip(by_cat.index.astype(str), avg_monthly.astype(float)):
+            if cat in self._discretionary:
                 budgets[cat] = round(max(0.0, avg * self.config.discretionary_target_multiplier), 2)
             else:
                 budgets[cat] = round(max(0.0, avg * self.config.essentials_target_multiplier), 2)
@@ -106,20 +117,19 @@ class BudgetAgent:
         }
 
     def budget_status(self, transactions_df: pd.DataFrame, budgets: dict[str, float]) -> dict[str, Any]:
-        df = transactions_df.copy()
-        df["amount"] = pd.to_numeric(df.get("amount"), errors="coerce")
-        df["date"] = pd.to_datetime(df.get("date"), errors="coerce")
-        df = df.dropna(subset=["amount", "date"])
+        df = coerce_transactions(transactions_df)
         if df.empty:
             return {"categories": [], "overall": {"total_spent": 0.0, "total_budget": 0.0, "over_budget": False}}
         if "category" not in df.columns:
             df["category"] = "Uncategorized"
 
-        df["year_month"] = df["date"].dt.strftime("%Y-%m")
-        current_month = df["year_month"].max()
-        cur = df[df["year_month"] == current_month]
+        # Compare integer month ordinals instead of formatting every row as "YYYY-MM"
+        months = df["date"].to_numpy().astype("datetime64[M]")
+        current = months.max()
+        current_month = str(np.datetime_as_string(current, unit="M"))
+        cur = df[months == current]
 
-        spent_by_cat = cur.groupby("category", as_index=False).agg(spent=("amount", "sum"))
+        spent_by_cat = cur.groupby("category", as_index=False, observed=True).agg(spent=("amount", "sum"))
         cats: list[dict[str, Any]] = []
 
         total_spent = 0.0
@@ -1,4 +1,11 @@
-from typing import Dict, Any
+import functools
+import re
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers import map_unique
 
 CATEGORY_RULES = {
     "Food": ["mcdonald", "chipotle", "restaurant", "cafe", "starbucks"],
@@ -8,20 +15,46 @@ CATEGORY_RULES = {
     "Housing": ["rent", "mortgage"],
 }
 
+# categorize_df()'s vectorized form of the same rule table: one regex per category
+_CATEGORY_PATTERNS = {
+    category: re.compile("|".join(re.escape(k) for k in keywords))
+    for category, keywords in CATEGORY_RULES.items()
+}
+
+# match_category()'s single matcher: one lookahead alternative per category,
+# tried in rule order from the start of the string, so the first category with
+# a keyword anywhere in the merchant wins. The empty group after each lookahead
+# tells us which one matched.
+_RULES_PATTERN = re.compile(
+    "|".join(f"(?=.*?(?:{pattern.pattern}))()" for pattern in _CATEGORY_PATTERNS.values()),
+    re.DOTALL,
+)
+_RULE_CATEGORIES = tuple(_CATEGORY_PATTERNS)
+
+
+# Merchant strings repeat heavily (same coffee shop, same streaming service), so
+# memoize per distinct string: repeats are a dict lookup instead of a regex scan.
+@functools.lru_cache(maxsize=4096)
+def match_category(merchant: str) -> str | None:
+    """Return the first rule category whose keyword appears in a lowercased merchant."""
+    m = _RULES_PATTERN.match(merchant)
+    return _RULE_CATEGORIES[m.lastindex - 1] if m else None
+
 
 class CategorizationAgent:
     def categorize(self, txn: Dict[str, Any]) -> Dict[str, Any]:
-        assert isinstance(txn, dict), f"Expected dict, got {type(txn)}"
+        if not isinstance(txn, dict):
+            raise TypeError(f"Expected dict, got {type(txn)}")
 
         merchant = str(txn.get("merchant", "")).lower()
 
-        for category, keywords in CATEGORY_RULES.items():
-            if any(keyword in merchant for keyword in keywords):
-                return {
-                    "category": category,
-                    "confidence": 0.9,
-                    "reason": f"Matched keyword rule for {category}"
-                }
+        category = match_category(merchant)
+        if category is not None:
+            return {
+                "category": category,
+                "confidence": 0.9,
+                "reason": f"Matched keyword rule for {category}"
+            }
 
         # No rule matched → low confidence, escalate later
         return {
@@ -29,3 +62,37 @@ class CategorizationAgent:
             "confidence": 0.3,
             "reason": "No matching keyword rules"
         }
+
+    @staticmethod
+    def _categorize_merchants(merchants: pd.Series) -> pd.Series:
+        merchant = merchants.astype(str).str.lower()
+        # np.select picks the first true condition, matching rule-table priority
+        conditions = [
+            merchant.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+            for pattern in _CATEGORY_PATTERNS.values()
+        ]
+        return pd.Series(np.select(conditions, list(_CATEGORY_PATTERNS), default="Uncategorized"), dtype=object)
+
+    def categorize_df(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vectorized categorize() for a whole DataFrame.
+
+        Runs one str.contains per category over the distinct merchants (then
+        broadcasts back by code) instead of a Python loop per row. Returns a
+        DataFrame aligned to transactions_df.index with the same keys
+        categorize() returns: category, confidence, reason.
+        """
+        if "merchant" in transactions_df.columns:
+            category = map_unique(transactions_df["merchant"], self._categorize_merchants)
+        else:
+            category = pd.Series("Uncategorized", index=transactions_df.index, dtype=object)
+        matched = (category != "Uncategorized").to_numpy(dtype=bool)
+
+        return pd.DataFrame(
+            {
+                "category": category,
+                "confidence": np.where(matched, 0.9, 0.3),
+                "reason": ("Matched keyword rule for " + category).where(matched, "No matching keyword rules"),
+            },
+            index=transactions_df.index,
+        )
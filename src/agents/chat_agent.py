@@ -8,14 +8,36 @@ for unrecognized questions.
 
 from __future__ import annotations
 
-import json
+import hashlib
 import re
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
 import pandas as pd
 
+from agents._openai_client import get_client, with_backoff
 from config.settings import LLM_ENABLED, OPENAI_API_KEY, OPENAI_INSIGHTS_MODEL
+from utils.helpers import (
+    format_year_month,
+    frame_fingerprint,
+    parse_year_month,
+    prepare_transactions,
+    shift_year_month,
+)
+
+# Rule-based question patterns, compiled once at import
+_SPEND_ON_RE = re.compile(r"spend on ([a-z\s]+?)(?: last month| this month| in (\d{4}-\d{2}))\??$")
+_TRANSACTIONS_OVER_RE = re.compile(r"transactions over \$?(\d+(?:\.\d+)?)")
+
+# LRU bound on cached LLM answers per agent
+ANSWER_CACHE_MAX_ENTRIES = 256
+
+# Source columns a prepared frame (and the answers built from it) depends on
+_PREPARED_COLUMNS = ["date", "amount", "category", "description"]
 
 
 @dataclass(frozen=True)
@@ -28,23 +50,39 @@ class ChatAgent:
     def __init__(self, enabled: bool | None = None):
         self.enabled = LLM_ENABLED if enabled is None else bool(enabled)
         self._client = None
+        # LLM answers keyed by a hash of (question, stats); repeats skip the API call
+        self._answer_cache: OrderedDict[str, str] = OrderedDict()
+        self._answer_lock = threading.Lock()  # query_many() answers from worker threads
+        # id(source frame) -> (weakref to it, content fingerprint, prepared frame)
+        self._prepared: dict[int, tuple[weakref.ref, bytes, pd.DataFrame]] = {}
         if self.enabled and OPENAI_API_KEY:
             try:
-                from openai import OpenAI
-
-                self._client = OpenAI(api_key=OPENAI_API_KEY)
+                self._client = get_client()
             except Exception:
                 self._client = None
 
-    @staticmethod
-    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
-        out = df.copy()
-        out["amount"] = pd.to_numeric(out.get("amount"), errors="coerce")
-        out["date"] = pd.to_datetime(out.get("date"), errors="coerce")
-        out = out.dropna(subset=["amount", "date"])
-        if "category" not in out.columns:
-            out["category"] = "Uncategorized"
-        out["year_month"] = out["date"].dt.strftime("%Y-%m")
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        prepare_transactions(), memoized per source frame.
+
+        A chat session passes the same frame to every query, so repeats reuse
+        the prepared copy. A hit needs the same frame object with the same
+        content in the columns the answers read, so in-place edits between
+        queries are picked up. One entry per source frame, dropped when that
+        frame is garbage-collected.
+        """
+        fingerprint = frame_fingerprint(df, _PREPARED_COLUMNS)
+        if fingerprint is None:
+            return prepare_transactions(df)
+        key = id(df)
+        hit = self._prepared.get(key)
+        known = hit is not None and hit[0]() is df
+        if known and hit[1] == fingerprint:
+            return hit[2]
+        out = prepare_transactions(df)
+        if not known:
+            weakref.finalize(df, self._prepared.pop, key, None)
+        self._prepared[key] = (weakref.ref(df), fingerprint, out)
         return out
 
     @staticmethod
@@ -63,36 +101,35 @@ class ChatAgent:
 
         # biggest category
         if "biggest" in q and "category" in q:
-            by_cat = df.groupby("category", as_index=False).agg(total=("amount", "sum")).sort_values("total", ascending=False)
+            by_cat = (
+                df.groupby("category", as_index=False, sort=False, observed=True)
+                .agg(total=("amount", "sum"))
+                .sort_values("total", ascending=False)
+            )
             if by_cat.empty:
                 return ChatAnswer("I don't have enough data to compute that yet.")
             top = by_cat.iloc[0]
             return ChatAnswer(f"Your biggest expense category is **{top['category']}** at **${float(top['total']):,.2f}**.")
 
         # how much spent on category last month / this month / YYYY-MM
-        m = re.search(r"spend on ([a-z\s]+?)(?: last month| this month| in (\d{4}-\d{2}))\??$", q)
+        m = _SPEND_ON_RE.search(q)
         if m:
             cat = m.group(1).strip().title()
             ym = m.group(2)
             if ym:
                 target = ym
+                target_key = parse_year_month(ym)
             else:
-                last = df["year_month"].max()
+                target_key = int(df["year_month"].max())
                 if "last month" in q:
-                    y, mo = map(int, last.split("-"))
-                    mo -= 1
-                    if mo == 0:
-                        y -= 1
-                        mo = 12
-                    target = f"{y:04d}-{mo:02d}"
-                else:
-                    target = last
-            sub = df[(df["category"].astype(str) == cat) & (df["year_month"] == target)]
+                    target_key = shift_year_month(target_key, -1)
+                target = format_year_month(target_key)
+            sub = df[(df["category"].astype(str) == cat) & (df["year_month"] == target_key)]
             total = float(sub["amount"].sum()) if not sub.empty else 0.0
             return ChatAnswer(f"You spent **${total:,.2f}** on **{cat}** in **{target}**.")
 
         # show transactions over $X (optional month)
-        m = re.search(r"transactions over \$?(\d+(?:\.\d+)?)", q)
+        m = _TRANSACTIONS_OVER_RE.search(q)
         if m:
             thresh = float(m.group(1))
             sub = df[df["amount"] >= thresh].sort_values("amount", ascending=False)
@@ -103,15 +140,11 @@ class ChatAgent:
 
         # compare this month vs last month
         if "compare" in q and "this month" in q and "last month" in q:
-            last = df["year_month"].max()
-            y, mo = map(int, last.split("-"))
-            prev_y, prev_m = y, mo - 1
-            if prev_m == 0:
-                prev_y -= 1
-                prev_m = 12
-            prev = f"{prev_y:04d}-{prev_m:02d}"
-            cur_total = float(df[df["year_month"] == last]["amount"].sum())
-            prev_total = float(df[df["year_month"] == prev]["amount"].sum())
+            last_key = int(df["year_month"].max())
+            prev_key = shift_year_month(last_key, -1)
+            last, prev = format_year_month(last_key), format_year_month(prev_key)
+            cur_total = float(df[df["year_month"] == last_key]["amount"].sum())
+            prev_total = float(df[df["year_month"] == prev_key]["amount"].sum())
             delta = cur_total - prev_total
             pct = (delta / prev_total * 100.0) if prev_total > 0 else 0.0
             return ChatAnswer(
@@ -120,45 +153,106 @@ class ChatAgent:
 
         return None
 
-    def query(self, user_question: str, transactions_df: pd.DataFrame) -> ChatAnswer:
-        df = self._prepare(transactions_df)
-        if df.empty:
-            return ChatAnswer("I don't see any valid transactions (missing/invalid dates or amounts).")
-
-        rb = self._answer_rule_based(user_question, df)
-        if rb is not None:
-            return rb
-
-        if self._client is None:
-            return ChatAnswer(
-                "I couldn't parse that question with the built-in rules. "
-                "Try something like: 'compare this month vs last month' or 'transactions over $100'."
+    @staticmethod
+    def _stats_text(df: pd.DataFrame) -> str:
+        """Compact stats for the LLM (avoid sending full raw data)."""
+        by_cat = (
+            df.groupby("category", as_index=False, sort=False, observed=True)
+            .agg(total=("amount", "sum"))
+            .sort_values("total", ascending=False)
+            .head(8)
+        )
+        by_month = (
+            df.groupby("year_month", as_index=False, sort=False).agg(total=("amount", "sum")).sort_values("year_month")
+        )
+        by_month["year_month"] = by_month["year_month"].map(format_year_month)
+        sample = df[["date", "description", "amount", "category"]].sort_values("date").tail(10)
+        sample = sample.assign(
+            date=sample["date"].dt.strftime("%Y-%m-%d"),
+            description=sample["description"].astype(str).str[:40],
+        )
+        # Compact CSV blocks instead of indented JSON: far fewer prompt tokens
+        return "\n".join(
+            f"{title}:\n{frame.to_csv(index=False, float_format='%.2f')}"
+            for title, frame in (
+                ("Monthly totals", by_month),
+                ("Top categories", by_cat),
+                ("Recent transactions", sample),
             )
+        )
 
-        # Best-effort LLM answer using compact stats (avoid sending full raw data).
+    def _answer_llm(self, user_question: str, stats: str) -> ChatAnswer:
+        key = hashlib.blake2b(f"{user_question}\n{stats}".encode("utf-8"), digest_size=16).hexdigest()
+        with self._answer_lock:
+            cached = self._answer_cache.get(key)
+            if cached is not None:
+                self._answer_cache.move_to_end(key)
+                return ChatAnswer(cached)
         try:
-            by_cat = (
-                df.groupby("category", as_index=False).agg(total=("amount", "sum")).sort_values("total", ascending=False).head(8)
-            )
-            by_month = df.groupby("year_month", as_index=False).agg(total=("amount", "sum")).sort_values("year_month")
-            stats = {
-                "months": by_month.to_dict(orient="records"),
-                "top_categories": by_cat.to_dict(orient="records"),
-                "sample_transactions": df[["date", "description", "amount", "category"]].sort_values("date").tail(10).to_dict(
-                    orient="records"
-                ),
-            }
             prompt = (
-                "Answer the user's question about their finances using ONLY the provided JSON stats. "
+                "Answer the user's question about their finances using ONLY the provided stats. "
                 "Be specific and include numbers.\n\n"
-                f"Question: {user_question}\n\nStats JSON:\n{json.dumps(stats, indent=2)}"
+                f"Question: {user_question}\n\nStats (CSV):\n{stats}"
             )
-            resp = self._client.chat.completions.create(
+            resp = with_backoff(
+                self._client.chat.completions.create,
                 model=OPENAI_INSIGHTS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
             )
             answer = (resp.choices[0].message.content or "").strip()
+            if answer:
+                with self._answer_lock:
+                    self._answer_cache[key] = answer
+                    self._answer_cache.move_to_end(key)
+                    if len(self._answer_cache) > ANSWER_CACHE_MAX_ENTRIES:
+                        self._answer_cache.popitem(last=False)
             return ChatAnswer(answer or "I couldn't generate an answer.")
         except Exception:
             return ChatAnswer("I couldn't answer that right now (LLM error).")
 
+    def query(self, user_question: str, transactions_df: pd.DataFrame) -> ChatAnswer:
+        return self.query_many([user_question], transactions_df)[0]
+
+    def query_many(
+        self, questions: list[str], transactions_df: pd.DataFrame, max_workers: int | None = None
+    ) -> list[ChatAnswer]:
+        """
+        Answer several questions against the same transactions.
+
+        The frame is prepared once and shared. Questions the built-in rules
+        can't answer go to the LLM concurrently (the calls are network-bound),
+        all using the same stats block. Answers are returned in question order.
+        """
+        df = self._prepare(transactions_df)
+        if df.empty:
+            return [ChatAnswer("I don't see any valid transactions (missing/invalid dates or amounts).") for _ in questions]
+
+        answers: list[ChatAnswer | None] = [self._answer_rule_based(q, df) for q in questions]
+        pending = [i for i, a in enumerate(answers) if a is None]
+        if not pending:
+            return answers
+
+        if self._client is None:
+            for i in pending:
+                answers[i] = ChatAnswer(
+                    "I couldn't parse that question with the built-in rules. "
+                    "Try something like: 'compare this month vs last month' or 'transactions over $100'."
+                )
+            return answers
+
+        try:
+            stats = self._stats_text(df)
+        except Exception:
+            for i in pending:
+                answers[i] = ChatAnswer("I couldn't answer that right now (LLM error).")
+            return answers
+
+        if len(pending) == 1:
+            answers[pending[0]] = self._answer_llm(questions[pending[0]], stats)
+            return answers
+
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            llm_answers = ex.map(lambda i: self._answer_llm(questions[i], stats), pending)
+            for i, answer in zip(pending, llm_answers):
+                answers[i] = answer
+        return answers
@@ -14,8 +14,42 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 
+import numpy as np
 import pandas as pd
 
+from utils.helpers import map_unique
+
+# (label, keywords) in priority order: the first label with a keyword in
+# "description merchant" wins.
+MERCHANT_TYPE_RULES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("grocery", ("whole foods", "costco", "kroger", "walmart", "aldi", "trader joe", "grocery")),
+    ("ride_share", ("uber", "lyft")),
+    ("travel", ("airbnb", "delta", "united", "hotel", "marriott", "hilton")),
+    ("coffee", ("starbucks", "coffee")),
+    ("streaming", ("netflix", "spotify", "hulu", "disney")),
+    ("retail", ("amazon", "target", "best buy", "apple store")),
+    ("dining", ("restaurant", "mcdonald", "chipotle", "cafe", "dining")),
+    ("utilities", ("comcast", "verizon", "at&t", "electric", "water", "gas")),
+)
+
+
+def _keyword_pattern(keys: tuple[str, ...]) -> "re.Pattern[str] | None":
+    """One compiled alternation matching any of `keys` as a substring (None if empty)."""
+    return re.compile("|".join(re.escape(k) for k in keys)) if keys else None
+
+
+_MERCHANT_TYPE_PATTERNS = tuple((label, _keyword_pattern(keys)) for label, keys in MERCHANT_TYPE_RULES)
+_BILL_PATTERN = _keyword_pattern(("electric", "water", "internet", "phone"))
+
+# Tag labels in sorted order; bit i of a row's tag mask selects _TAG_LABELS[i].
+# _TAG_STRINGS maps every mask to its comma-joined tags, so building the tags
+# column is a single table lookup per row.
+_TAG_LABELS = ("discretionary", "essential", "income", "recurring_candidate", "transfer")
+_TAG_STRINGS = np.array(
+    [",".join(label for i, label in enumerate(_TAG_LABELS) if mask >> i & 1) for mask in range(1 << len(_TAG_LABELS))],
+    dtype=object,
+)
+
 
 @dataclass(frozen=True)
 class EnrichmentConfig:
@@ -37,43 +71,66 @@ class EnrichmentConfig:
 class EnrichmentAgent:
     def __init__(self, config: EnrichmentConfig | None = None):
         self.config = config or EnrichmentConfig()
+        self._subscription_pattern = _keyword_pattern(self.config.subscription_keywords)
 
     @staticmethod
     def _norm(s: object) -> str:
         return str(s or "").strip().lower()
 
-    def _classify_expense_type(self, row: pd.Series) -> str:
-        category = self._norm(row.get("category"))
-        desc = self._norm(row.get("description"))
-        merchant = self._norm(row.get("merchant"))
-
-        if category == "income" or desc.startswith("payroll") or "salary" in desc:
-            return "income"
-        if category == "transfer" or "transfer" in desc:
-            return "transfer"
-        if any(k in desc or k in merchant for k in self.config.subscription_keywords):
-            return "subscription"
-        if "utility" in category or any(k in desc for k in ("electric", "water", "internet", "phone")):
-            return "bill"
-        return "purchase"
+    def _norm_column(self, df: pd.DataFrame, column: str) -> pd.Series:
+        """Vectorized _norm() of a column (empty strings if it is missing)."""
+        if column not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        return map_unique(df[column], lambda u: u.map(self._norm))
+
+    @staticmethod
+    def _as_str(values: pd.Series) -> pd.Series:
+        """Same text as str(v) per value; missing values in string dtypes become 'nan'."""
+        return values.astype(str).fillna("nan")
+
+    @staticmethod
+    def _contains(values: pd.Series, pattern: "re.Pattern[str] | str | None") -> np.ndarray:
+        """Row mask of `values` containing a compiled pattern or a literal substring."""
+        if pattern is None:
+            return np.zeros(len(values), dtype=bool)
+        regex = not isinstance(pattern, str)
+        return values.str.contains(pattern, regex=regex, na=False).to_numpy(dtype=bool)
+
+    def _classify_expense_type(self, category: pd.Series, desc: pd.Series, merchant: pd.Series) -> np.ndarray:
+        is_income = (
+            category.eq("income").to_numpy(dtype=bool)
+            | desc.str.startswith("payroll", na=False).to_numpy(dtype=bool)
+            | self._contains(desc, "salary")
+        )
+        is_transfer = category.eq("transfer").to_numpy(dtype=bool) | self._contains(desc, "transfer")
+        is_subscription = self._contains(desc, self._subscription_pattern) | self._contains(
+            merchant, self._subscription_pattern
+        )
+        is_bill = self._contains(category, "utility") | self._contains(desc, _BILL_PATTERN)
+        # np.select takes the first true condition, same order as the original if-chain
+        return np.select(
+            [is_income, is_transfer, is_subscription, is_bill],
+            ["income", "transfer", "subscription", "bill"],
+            default="purchase",
+        ).astype(object)
 
     @staticmethod
-    def _merchant_type(desc: str, merchant: str) -> str:
-        s = f"{desc} {merchant}".lower()
-        rules = [
-            ("grocery", ("whole foods", "costco", "kroger", "walmart", "aldi", "trader joe", "grocery")),
-            ("ride_share", ("uber", "lyft")),
-            ("travel", ("airbnb", "delta", "united", "hotel", "marriott", "hilton")),
-            ("coffee", ("starbucks", "coffee")),
-            ("streaming", ("netflix", "spotify", "hulu", "disney")),
-            ("retail", ("amazon", "target", "best buy", "apple store")),
-            ("dining", ("restaurant", "mcdonald", "chipotle", "cafe", "dining")),
-            ("utilities", ("comcast", "verizon", "at&t", "electric", "water", "gas")),
-        ]
-        for label, keys in rules:
-            if any(k in s for k in keys):
-                return label
-        return "unknown"
+    def _normalize_merchants(merchants: pd.Series) -> pd.Series:
+        # Order matters: suffix words are matched after noise characters are
+        # dropped and whitespace is collapsed; the final strip also covers
+        # leading/trailing whitespace left by the first two steps.
+        return (
+            merchants.str.lower()
+            .str.replace(r"[^a-z0-9\s]", "", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.replace(r"\b(inc|llc|co|corp)\b", "", regex=True)
+            .str.strip()
+        )
+
+    def _merchant_type(self, desc: pd.Series, merchant: pd.Series) -> np.ndarray:
+        s = (self._as_str(desc) + " " + self._as_str(merchant)).str.lower()
+        conditions = [self._contains(s, pattern) for _, pattern in _MERCHANT_TYPE_PATTERNS]
+        return np.select(conditions, [label for label, _ in _MERCHANT_TYPE_PATTERNS], default="unknown").astype(object)
 
     def enrich_dataframe(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
         df = transactions_df.copy()
@@ -86,55 +143,43 @@ class EnrichmentAgent:
             # fall back to description as a best-effort "merchant"
             df["merchant"] = df["description"].astype(str).str.split().str[:2].str.join(" ")
 
+        category = self._norm_column(df, "category")
+        desc = self._norm_column(df, "description")
+        merchant = self._norm_column(df, "merchant")
+
         # expense_type
-        df["expense_type"] = df.apply(self._classify_expense_type, axis=1)
+        expense_type = self._classify_expense_type(category, desc, merchant)
+        df["expense_type"] = expense_type
 
         # tags
-        tags = []
-        for _, row in df.iterrows():
-            row_tags: list[str] = []
-            et = str(row.get("expense_type") or "")
-            if et in {"subscription", "bill"}:
-                row_tags.append("recurring_candidate")
-            if et == "income":
-                row_tags.append("income")
-            if et == "transfer":
-                row_tags.append("transfer")
-
+        recurring = np.isin(expense_type, ["subscription", "bill"])
+        tag_flags = (
             # crude tax tag heuristic
-            if self._norm(row.get("category")) in {"utilities", "rent"}:
-                row_tags.append("essential")
-            if self._norm(row.get("category")) in {"shopping", "entertainment", "dining"}:
-                row_tags.append("discretionary")
-
-            tags.append(",".join(sorted(set(row_tags))))
-
-        df["tags"] = tags
+            category.isin(["shopping", "entertainment", "dining"]).to_numpy(dtype=bool),
+            category.isin(["utilities", "rent"]).to_numpy(dtype=bool),
+            expense_type == "income",
+            recurring,
+            expense_type == "transfer",
+        )
+        tag_mask = np.zeros(len(df), dtype=np.intp)
+        for bit, flag in enumerate(tag_flags):
+            tag_mask |= flag.astype(np.intp) << bit
+        df["tags"] = _TAG_STRINGS[tag_mask]
 
         # merchant_type
-        df["merchant_type"] = [
-            self._merchant_type(str(d), str(m)) for d, m in zip(df["description"].astype(str), df["merchant"].astype(str))
-        ]
+        df["merchant_type"] = self._merchant_type(df["description"], df["merchant"])
 
-        # normalize merchant (strip noise)
-        df["merchant_normalized"] = (
-            df["merchant"].astype(str).str.lower().str.replace(r"[^a-z0-9\\s]", "", regex=True).str.strip()
-        )
-        df["merchant_normalized"] = df["merchant_normalized"].str.replace(r"\\s+", " ", regex=True)
-        df["merchant_normalized"] = df["merchant_normalized"].str.replace(r"\\b(inc|llc|co|corp)\\b", "", regex=True).str.strip()
+        # normalize merchant (strip noise), once per distinct merchant
+        df["merchant_normalized"] = map_unique(df["merchant"].astype(str), self._normalize_merchants)
 
         # best-effort recurring merchant hint based on description tokens
-        df["recurring_hint"] = df["tags"].astype(str).str.contains("recurring_candidate", na=False)
+        df["recurring_hint"] = recurring
 
-        # optional: extract a likely subscription/bill name
-        def _sub_name(row: pd.Series) -> str:
-            if not str(row.get("recurring_hint")):
-                return ""
-            txt = f"{row.get('merchant_normalized','')} {row.get('description','')}".lower()
-            m = re.search(r"(netflix|spotify|hulu|disney|prime|comcast|verizon|att|at&t|apple|google|adobe)", txt)
-            return (m.group(1) if m else row.get("merchant_normalized", ""))[:50]
-
-        df["recurring_name"] = df.apply(_sub_name, axis=1)
+        # optional: extract a likely subscription/bill name, else the normalized merchant
+        txt = (self._as_str(df["merchant_normalized"]) + " " + self._as_str(df["description"])).str.lower()
+        name = txt.str.extract(
+            r"(netflix|spotify|hulu|disney|prime|comcast|verizon|att|at&t|apple|google|adobe)", expand=False
+        )
+        df["recurring_name"] = name.fillna(df["merchant_normalized"]).str[:50]
 
         return df
-
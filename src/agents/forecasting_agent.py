@@ -14,10 +14,28 @@ from typing import Literal
 import numpy as np
 import pandas as pd
 
+from utils.helpers import format_year_month, prepare_transactions, shift_year_month
+
 
 ForecastGranularity = Literal["total", "category"]
 
 
+def _trend_by_group(codes: np.ndarray, y: np.ndarray, lookback: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Last value and last step of each group's lookback window, in one array pass.
+
+    `codes` are contiguous group ids 0..K-1 in sorted order (rows of a group are
+    adjacent and time-ordered). Returns (base, slope, points) per group where
+    `points` is how many months fall in the window; groups with fewer than two
+    points get a zero slope, and empty windows a zero base.
+    """
+    ends = np.flatnonzero(np.r_[codes[1:] != codes[:-1], True])
+    points = np.minimum(np.bincount(codes), max(lookback, 0))
+    base = np.where(points >= 1, y[ends], 0.0)
+    slope = np.where(points >= 2, y[ends] - y[ends - 1], 0.0)
+    return base, slope, points
+
+
 @dataclass(frozen=True)
 class ForecastConfig:
     months_ahead: int = 3
@@ -30,35 +48,13 @@ class ForecastingAgent:
         self.config = config or ForecastConfig()
 
     @staticmethod
-    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
-        out = df.copy()
-        out["amount"] = pd.to_numeric(out.get("amount"), errors="coerce")
-        out["date"] = pd.to_datetime(out.get("date"), errors="coerce")
-        out = out.dropna(subset=["date", "amount"])
-        out["year_month"] = out["date"].dt.to_period("M").dt.to_timestamp()
-        if "category" not in out.columns:
-            out["category"] = "Uncategorized"
-        return out
-
-    @staticmethod
-    def _future_month_starts(last_month_start: pd.Timestamp, months_ahead: int) -> list[pd.Timestamp]:
-        return [
-            (last_month_start + pd.offsets.MonthBegin(i)).normalize()
-            for i in range(1, months_ahead + 1)
-        ]
+    def _future_months(last_year_month: int, months_ahead: int) -> list[str]:
+        return [format_year_month(shift_year_month(last_year_month, i)) for i in range(1, months_ahead + 1)]
 
     @staticmethod
-    def _fit_linear(y: np.ndarray) -> tuple[np.ndarray, str]:
-        """
-        Fit a simple linear trend over indices 0..n-1.
-        Returns predicted values for existing points and method label.
-        """
-        n = len(y)
-        if n <= 1:
-            return y, "flat"
-        x = np.arange(n, dtype=float)
-        slope, intercept = np.polyfit(x, y.astype(float), 1)
-        return slope * x + intercept, "linear"
+    def _method_label(points: int) -> str:
+        """Forecast method label for a lookback window with `points` months."""
+        return "linear" if points > 1 else "flat"
 
     def forecast_spending(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -68,23 +64,23 @@ class ForecastingAgent:
         - forecast_total_spent
         - method
         """
-        df = self._prepare(transactions_df)
+        df = prepare_transactions(transactions_df)
         if df.empty:
             return pd.DataFrame(columns=["month", "category", "forecast_total_spent", "method"])
 
         if self.config.granularity == "total":
             grouped = (
-                df.groupby("year_month", as_index=False)
+                df.groupby("year_month", as_index=False, sort=False)
                 .agg(total_spent=("amount", "sum"))
                 .sort_values("year_month")
             )
             last = grouped["year_month"].max()
-            future = self._future_month_starts(last, self.config.months_ahead)
+            future = self._future_months(last, self.config.months_ahead)
 
             # lookback slice
             lookback = grouped.tail(self.config.lookback_months)
             y = lookback["total_spent"].to_numpy()
-            _, method = self._fit_linear(y)
+            method = self._method_label(len(y))
             # forecast: continue slope from last two points if possible, else flat
             if len(y) <= 1:
                 slope = 0.0
@@ -96,7 +92,7 @@ class ForecastingAgent:
 
             out = pd.DataFrame(
                 {
-                    "month": [d.strftime("%Y-%m") for d in future],
+                    "month": future,
                     "category": ["TOTAL"] * len(future),
                     "forecast_total_spent": [round(v, 2) for v in preds],
                     "method": [method] * len(future),
@@ -106,36 +102,32 @@ class ForecastingAgent:
 
         # category-level
         grouped = (
-            df.groupby(["category", "year_month"], as_index=False)
+            df.groupby(["category", "year_month"], as_index=False, sort=False, observed=True)
             .agg(total_spent=("amount", "sum"))
             .sort_values(["category", "year_month"])
         )
         last_month = grouped["year_month"].max()
-        future_months = self._future_month_starts(last_month, self.config.months_ahead)
+        future_months = self._future_months(last_month, self.config.months_ahead)
 
-        rows: list[dict] = []
-        for category, cdf in grouped.groupby("category"):
-            lookback = cdf.tail(self.config.lookback_months)
-            y = lookback["total_spent"].to_numpy()
-            _, method = self._fit_linear(y)
-
-            if len(y) <= 1:
-                slope = 0.0
-                base = float(y[-1]) if len(y) == 1 else 0.0
-            else:
-                slope = float(y[-1] - y[-2])
-                base = float(y[-1])
+        # grouped is sorted by category, so factorized codes are contiguous
+        codes, categories = pd.factorize(grouped["category"])
+        bases, slopes, points = _trend_by_group(
+            codes, grouped["total_spent"].to_numpy(dtype=float), self.config.lookback_months
+        )
 
-            for i, dt in enumerate(future_months, start=1):
-                rows.append(
-                    {
-                        "month": dt.strftime("%Y-%m"),
-                        "category": category,
-                        "forecast_total_spent": round(max(0.0, base + slope * i), 2),
-                        "method": method,
-                    }
-                )
-
-        out = pd.DataFrame(rows).sort_values(["month", "forecast_total_spent"], ascending=[True, False])
+        # one row per (category, future month), category-major
+        steps = np.arange(1, len(future_months) + 1, dtype=float)
+        preds = bases[:, None] + slopes[:, None] * steps
+        preds = np.where(preds > 0.0, preds, 0.0).ravel()
+        methods = [self._method_label(n) for n in points.tolist()]
+        out = pd.DataFrame(
+            {
+                "month": np.tile(np.asarray(future_months, dtype=object), len(categories)),
+                "category": np.repeat(np.asarray(categories, dtype=object), len(future_months)),
+                "forecast_total_spent": [round(v, 2) for v in preds.tolist()],
+                "method": np.repeat(np.asarray(methods, dtype=object), len(future_months)),
+            }
+        )
+        out = out.sort_values(["month", "forecast_total_spent"], ascending=[True, False])
         return out
 
@@ -16,6 +16,8 @@ from typing import Any
 
 import pandas as pd
 
+from utils.helpers import format_year_month, parse_year_month, prepare_transactions
+
 
 @dataclass(frozen=True)
 class GoalAgentConfig:
@@ -41,17 +43,13 @@ class GoalAgent:
         path.write_text(json.dumps(goals, indent=2), encoding="utf-8")
 
     def evaluate_goals(self, transactions_df: pd.DataFrame, goals: list[dict[str, Any]]) -> dict[str, Any]:
-        df = transactions_df.copy()
-        df["amount"] = pd.to_numeric(df.get("amount"), errors="coerce")
-        df["date"] = pd.to_datetime(df.get("date"), errors="coerce")
-        df = df.dropna(subset=["amount", "date"])
+        df = prepare_transactions(transactions_df)
         if df.empty or not goals:
             return {"goals": [], "summary": "No goals or no data."}
-        if "category" not in df.columns:
-            df["category"] = "Uncategorized"
 
-        df["year_month"] = df["date"].dt.strftime("%Y-%m")
-        latest = df["year_month"].max()
+        latest = format_year_month(df["year_month"].max())
+        # One pass over the transactions; each goal is then a dict lookup
+        totals = df.groupby(["year_month", "category"], sort=False, observed=True)["amount"].sum().to_dict()
 
         results: list[dict[str, Any]] = []
         for g in goals:
@@ -60,7 +58,7 @@ class GoalAgent:
                 cat = str(g.get("category", ""))
                 pct = float(g.get("percent", 0))
                 month = str(g.get("month", latest))
-                spent = float(df[(df["year_month"] == month) & (df["category"] == cat)]["amount"].sum())
+                spent = float(totals.get((parse_year_month(month), cat), 0.0))
                 results.append(
                     {
                         "type": gtype,
@@ -16,6 +16,8 @@ from typing import Any
 import numpy as np
 import pandas as pd
 
+from utils.helpers import prepare_transactions, true_mask
+
 
 @dataclass(frozen=True)
 class HealthConfig:
@@ -30,43 +32,32 @@ class FinancialHealthAgent:
     def __init__(self, config: HealthConfig | None = None):
         self.config = config or HealthConfig()
 
-    @staticmethod
-    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
-        out = df.copy()
-        out["amount"] = pd.to_numeric(out.get("amount"), errors="coerce")
-        out["date"] = pd.to_datetime(out.get("date"), errors="coerce")
-        out = out.dropna(subset=["amount", "date"])
-        if "category" not in out.columns:
-            out["category"] = "Uncategorized"
-        out["year_month"] = out["date"].dt.to_period("M").dt.to_timestamp()
-        return out
-
     @staticmethod
     def _clamp01(x: float) -> float:
         return float(max(0.0, min(1.0, x)))
 
     def calculate(self, transactions_df: pd.DataFrame, budget_status: dict[str, Any] | None = None) -> dict[str, Any]:
-        df = self._prepare(transactions_df)
+        df = prepare_transactions(transactions_df)
         if df.empty:
             return {"score": 0, "reasons": ["No valid transactions available."], "components": {}}
 
         # monthly volatility (std/mean)
-        monthly = df.groupby("year_month", as_index=False).agg(total=("amount", "sum")).sort_values("year_month")
-        totals = monthly["total"].astype(float).to_numpy()
-        mean = float(np.mean(totals)) if len(totals) else 0.0
-        std = float(np.std(totals)) if len(totals) else 0.0
+        totals = df.groupby("year_month", sort=False)["amount"].sum().to_numpy(dtype=float)
+        mean = float(totals.mean()) if len(totals) else 0.0
+        std = float(np.sqrt(np.square(totals - mean).mean())) if len(totals) else 0.0
         volatility = (std / mean) if mean > 1e-9 else 0.0
         # map: volatility 0 -> good, >=1 -> bad
         vol_score = 1.0 - self._clamp01(volatility / 1.0)
 
         # discretionary share
-        disc = df[df["category"].isin(self.config.discretionary_categories)]
-        disc_share = float(disc["amount"].sum() / max(float(df["amount"].sum()), 1e-9))
+        amounts = df["amount"].to_numpy(dtype=float)
+        is_disc = df["category"].isin(self.config.discretionary_categories).to_numpy(dtype=bool)
+        disc_share = float(amounts[is_disc].sum() / max(float(amounts.sum()), 1e-9))
         disc_score = 1.0 - self._clamp01(disc_share / 0.6)  # 60%+ discretionary => very low
 
         # anomalies
         if "is_anomaly" in df.columns:
-            anom_rate = float((df["is_anomaly"] == True).mean())  # noqa: E712
+            anom_rate = np.count_nonzero(true_mask(df["is_anomaly"])) / len(df)
         else:
             anom_rate = 0.0
         anom_score = 1.0 - self._clamp01(anom_rate / 0.2)  # 20% anomalies => very low
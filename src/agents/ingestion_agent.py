@@ -1,18 +1,45 @@
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+
+from utils.helpers import read_csv
 
 
 class IngestionAgent:
     def __init__(self, input_path: Path):
         self.input_path = input_path
 
+    @staticmethod
+    def iter_records(df: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+        # Columns are converted to Python lists once and zipped row-wise, which
+        # gives the same native values as to_dict(orient="records") without
+        # boxing every cell separately.
+        columns = list(df.columns)
+        for row in zip(*(df[c].tolist() for c in columns)):
+            yield dict(zip(columns, row))
+
+    def load_dataframe(self) -> pd.DataFrame:
+        """The transactions CSV as a DataFrame, for callers that work column-wise."""
+        return read_csv(self.input_path)
+
     def load_transactions(self) -> List[Dict[str, Any]]:
-        df = pd.read_csv(self.input_path)
+        df = self.load_dataframe()
 
         # CRITICAL LINE
         # Converts each row into a dictionary
-        transactions = df.to_dict(orient="records")
+        transactions = list(self.iter_records(df))
 
         return transactions
 
+    def iter_transactions(self, chunksize: int = 10_000) -> Iterator[Dict[str, Any]]:
+        """
+        Yield transactions one dict at a time, reading the CSV in chunks.
+
+        Peak memory is bounded by `chunksize` rows instead of the whole file.
+        Column types are inferred per chunk, so e.g. an integer column with a
+        missing value in one chunk yields floats for that chunk only; use
+        load_transactions() when the whole file fits in memory.
+        """
+        with pd.read_csv(self.input_path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield from self.iter_records(chunk)
@@ -7,19 +7,27 @@ Works without an LLM; if LLM is enabled, it will optionally enhance the narrativ
 
 from __future__ import annotations
 
-import json
+import threading
 from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from agents._openai_client import get_client, with_backoff
 from config.settings import LLM_ENABLED, OPENAI_API_KEY, OPENAI_INSIGHTS_MODEL
-from tools.expense_stats import ExpenseAnalytics
+from agents.bill_agent import RECURRING_TAG
+from tools.expense_stats import SUMMARY_COLUMNS, ExpenseAnalytics
+from utils.helpers import contains_text, dumps_json, frame_fingerprint, loads_json, true_mask
+
+# Columns _basic_insights() reads: the ExpenseAnalytics ones plus the flag/tag counts
+_INSIGHT_COLUMNS = [*SUMMARY_COLUMNS, "is_anomaly", "tags"]
 
 
 @dataclass(frozen=True)
 class InsightsConfig:
     top_n_categories: int = 5
+    cache_max_entries: int = 8
 
 
 class InsightsAgent:
@@ -27,11 +35,11 @@ class InsightsAgent:
         self.config = config or InsightsConfig()
         self.enabled = LLM_ENABLED if enabled is None else bool(enabled)
         self._client = None
+        self._cache: dict[bytes, dict[str, Any]] = {}
+        self._cache_lock = threading.Lock()  # one agent may serve several threads
         if self.enabled and OPENAI_API_KEY:
             try:
-                from openai import OpenAI
-
-                self._client = OpenAI(api_key=OPENAI_API_KEY)
+                self._client = get_client()
             except Exception:
                 self._client = None
 
@@ -42,10 +50,28 @@ class InsightsAgent:
         except Exception:
             return default
 
+    def _cached_basic_insights(self, df: pd.DataFrame) -> dict[str, Any]:
+        # Repeated calls on the same data (dashboard refreshes, tests) skip the
+        # ExpenseAnalytics work. Callers only set top-level keys on the payload,
+        # so a shallow copy keeps the cached one intact.
+        key = frame_fingerprint(df, _INSIGHT_COLUMNS)
+        if key is None:
+            return self._basic_insights(df)
+        with self._cache_lock:
+            payload = self._cache.get(key)
+        if payload is None:
+            payload = self._basic_insights(df)
+            with self._cache_lock:
+                if key not in self._cache and len(self._cache) >= self.config.cache_max_entries:
+                    del self._cache[next(iter(self._cache))]
+                self._cache[key] = payload
+        return dict(payload)
+
     def _basic_insights(self, df: pd.DataFrame) -> dict[str, Any]:
-        analytics = ExpenseAnalytics(df)
-        cat = analytics.get_category_summary().head(self.config.top_n_categories)
-        monthly = analytics.get_monthly_summary()
+        # Not summaries_for(): results are already cached per frame above
+        summaries = ExpenseAnalytics(df).compute_all()
+        cat = summaries["category_summary"].head(self.config.top_n_categories)
+        monthly = summaries["monthly_summary"]
 
         insights: list[dict[str, Any]] = []
         if not cat.empty:
@@ -59,10 +85,11 @@ class InsightsAgent:
             )
 
         if len(monthly) >= 2:
-            last = monthly.iloc[-1]
-            prev = monthly.iloc[-2]
-            delta = self._safe_float(last["total_spent"]) - self._safe_float(prev["total_spent"])
-            pct = (delta / max(self._safe_float(prev["total_spent"]), 1e-9)) * 100.0
+            totals = monthly["total_spent"].to_numpy()
+            last_total = self._safe_float(totals[-1])
+            prev_total = self._safe_float(totals[-2])
+            delta = last_total - prev_total
+            pct = (delta / max(prev_total, 1e-9)) * 100.0
             insights.append(
                 {
                     "type": "month_over_month",
@@ -72,7 +99,7 @@ class InsightsAgent:
 
         # Anomalies
         if "is_anomaly" in df.columns:
-            anom_count = int((df["is_anomaly"] == True).sum())  # noqa: E712
+            anom_count = int(np.count_nonzero(true_mask(df["is_anomaly"])))
             if anom_count:
                 insights.append(
                     {
@@ -83,7 +110,7 @@ class InsightsAgent:
 
         # Recurring
         if "tags" in df.columns:
-            recurring_count = int(df["tags"].astype(str).str.contains("recurring", na=False).sum())
+            recurring_count = int(np.count_nonzero(contains_text(df["tags"], RECURRING_TAG)))
             if recurring_count:
                 insights.append(
                     {
@@ -104,16 +131,41 @@ class InsightsAgent:
             "insights": insights,
             "recommendations": recommendations,
             "summary_stats": {
-                "total_spending": analytics.get_total_spending(),
-                "transaction_count": analytics.get_transaction_count(),
+                "total_spending": summaries["total_spending"],
+                "transaction_count": summaries["transaction_count"],
             },
             "top_categories": cat.to_dict(orient="records") if not cat.empty else [],
             "monthly_summary": monthly.to_dict(orient="records") if not monthly.empty else [],
         }
         return payload
 
+    @classmethod
+    def _llm_stats(cls, payload: dict[str, Any], max_months: int = 12) -> dict[str, Any]:
+        """
+        The part of the payload the narrative needs, in a token-lean shape.
+
+        [name, total] pairs instead of record dicts, only the latest months, and
+        the heuristic insight texts (anomaly/recurring counts aren't in the tables).
+        """
+        stats = payload.get("summary_stats", {})
+        return {
+            "totals": {
+                "spending": round(cls._safe_float(stats.get("total_spending")), 2),
+                "n": stats.get("transaction_count", 0),
+            },
+            "top_cats": [
+                [c.get("category"), round(cls._safe_float(c.get("total_spent")), 2)]
+                for c in payload.get("top_categories", [])
+            ],
+            "monthly": [
+                [m.get("month"), round(cls._safe_float(m.get("total_spent")), 2)]
+                for m in payload.get("monthly_summary", [])[-max_months:]
+            ],
+            "insights": [i["text"] for i in payload.get("insights", [])],
+        }
+
     def generate_insights(self, transactions_df: pd.DataFrame) -> dict[str, Any]:
-        payload = self._basic_insights(transactions_df)
+        payload = self._cached_basic_insights(transactions_df)
 
         if self._client is None:
             payload["narrative"] = " ".join([i["text"] for i in payload.get("insights", [])]) or "No insights available."
@@ -124,14 +176,15 @@ class InsightsAgent:
                 "You are a helpful personal finance analyst. Using the JSON stats below, "
                 "write a short, friendly narrative summary (4-8 sentences) and return JSON:\n"
                 "{narrative: string, extra_recommendations: [string]}.\n\n"
-                f"Stats JSON:\n{json.dumps(payload, indent=2)}"
+                f"Stats JSON:\n{dumps_json(self._llm_stats(payload))}"
             )
-            resp = self._client.chat.completions.create(
+            resp = with_backoff(
+                self._client.chat.completions.create,
                 model=OPENAI_INSIGHTS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
             )
             content = (resp.choices[0].message.content or "").strip()
-            enriched = json.loads(content)
+            enriched = loads_json(content)
             if isinstance(enriched, dict):
                 if "narrative" in enriched:
                     payload["narrative"] = enriched["narrative"]
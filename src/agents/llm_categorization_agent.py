@@ -1,19 +1,21 @@
+import asyncio
+import functools
+import hashlib
 import json
-from typing import Dict
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
 
-from openai import OpenAI
-from config.settings import LLM_ENABLED, OPENAI_API_KEY, OPENAI_CATEGORIZATION_MODEL
+from agents._openai_client import get_async_client, get_client, with_backoff, with_backoff_async, with_backoff_create
+from config.settings import LLM_BATCH_SIZE, LLM_ENABLED, OPENAI_API_KEY, OPENAI_CATEGORIZATION_MODEL
 from config.categories import ALLOWED_CATEGORIES
+from utils.helpers import dumps_json, loads_json, write_json
 
 
 SYSTEM_PROMPT = """
 You are a financial transaction categorization engine.
-
-Rules:
-- Respond ONLY with valid JSON.
-- Do NOT include markdown.
-- Do NOT include explanations outside JSON.
-- Output MUST be parseable by json.loads().
 """
 
 USER_PROMPT_TEMPLATE = """
@@ -35,11 +37,139 @@ Rules:
 - If confidence < 0.5, category MUST be "Uncategorized".
 """
 
+BATCH_USER_PROMPT_TEMPLATE = """
+Transactions (JSON array; "i" is each transaction's index):
+{transactions}
+
+Allowed categories:
+{categories}
+
+Return a JSON object with "results": one entry per transaction, each with:
+- i (the transaction's index)
+- category
+- confidence (0 to 1)
+- reason
+
+Rules:
+- Choose exactly one category per transaction.
+- If confidence < 0.5, category MUST be "Uncategorized".
+"""
+
+# Transactions per multi-transaction request: the system prompt and category
+# list are sent once per request instead of once per transaction.
+BATCH_SIZE = LLM_BATCH_SIZE
+
+_RESULT_PROPERTIES = {
+    "category": {"type": "string", "enum": list(ALLOWED_CATEGORIES)},
+    "confidence": {"type": "number"},
+    "reason": {"type": "string"},
+}
+
+
+def _json_schema_format(name: str, schema: Dict) -> Dict:
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+# Structured output: the API constrains the reply to these schemas, so the prompts
+# don't need JSON formatting rules and the category is always an allowed one.
+RESPONSE_FORMAT = _json_schema_format(
+    "transaction_category",
+    {
+        "type": "object",
+        "properties": _RESULT_PROPERTIES,
+        "required": list(_RESULT_PROPERTIES),
+        "additionalProperties": False,
+    },
+)
+BATCH_RESPONSE_FORMAT = _json_schema_format(
+    "transaction_categories",
+    {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"i": {"type": "integer"}, **_RESULT_PROPERTIES},
+                    "required": ["i", *_RESULT_PROPERTIES],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["results"],
+        "additionalProperties": False,
+    },
+)
+
+# The category list never changes at runtime, so fill it into the templates once;
+# per call only the transaction fields are formatted.
+_CATEGORIES_BLOCK = "\n".join(ALLOWED_CATEGORIES)
+_USER_PROMPT = USER_PROMPT_TEMPLATE.replace("{categories}", _CATEGORIES_BLOCK)
+_BATCH_USER_PROMPT = BATCH_USER_PROMPT_TEMPLATE.replace("{categories}", _CATEGORIES_BLOCK)
+
+_NON_LETTERS_RE = re.compile(r"[^a-z ]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+CACHE_MAX_ENTRIES = 4096
+
+# A letters-only key this short, or made only of these words, says nothing about
+# the merchant ("Check 1001", "ACH 55102", non-Latin text), so the whole
+# description is used instead.
+_MIN_MERCHANT_KEY_CHARS = 3
+_GENERIC_WORDS = frozenset(
+    {"ach", "check", "cheque", "chk", "debit", "credit", "deposit", "payment", "pos", "transfer", "withdrawal"}
+)
+
+# Changes whenever the prompts or response schemas do. The cache file records it
+# with the model name, and a file written under other values is not loaded.
+PROMPT_VERSION = hashlib.sha1(
+    dumps_json([SYSTEM_PROMPT, _USER_PROMPT, _BATCH_USER_PROMPT, RESPONSE_FORMAT, BATCH_RESPONSE_FORMAT]).encode()
+).hexdigest()[:12]
+_CACHE_HEADER = {"model": OPENAI_CATEGORIZATION_MODEL, "prompt_version": PROMPT_VERSION}
+
+
+# Descriptions repeat heavily (same merchant every month), so the regex
+# normalization runs once per distinct string.
+@functools.lru_cache(maxsize=8192)
+def merchant_key(description) -> str:
+    """
+    Lowercased description with digits/punctuation dropped (store numbers, refs), max 40 chars.
+
+    Falls back to the whole lowercased description when that leaves nothing
+    merchant-specific.
+    """
+    raw = str(description or "").lower()
+    key = _WHITESPACE_RE.sub(" ", _NON_LETTERS_RE.sub(" ", raw)).strip()[:40]
+    if len(key) < _MIN_MERCHANT_KEY_CHARS or _GENERIC_WORDS.issuperset(key.split()):
+        return _WHITESPACE_RE.sub(" ", raw).strip()
+    return key
+
+
+def amount_bucket(amount) -> str:
+    try:
+        value = abs(float(amount))
+    except (TypeError, ValueError):
+        return "?"
+    if value < 10:
+        return "<10"
+    if value < 100:
+        return "<100"
+    if value < 1000:
+        return "<1000"
+    return ">=1000"
+
+
+def cache_key(transaction: Dict) -> str:
+    return f"{merchant_key(transaction.get('description', ''))}|{amount_bucket(transaction.get('amount', 0))}"
+
 
 class LLMCategorizationAgent:
-    def __init__(self, enabled: bool | None = None):
+    def __init__(self, enabled: bool | None = None, cache_path: Path | None = None):
         self.enabled = LLM_ENABLED if enabled is None else bool(enabled)
         self.disabled_reason = ""
+        # LRU of LLM results keyed by cache_key(): repeat merchants skip the API call
+        self.cache_path = cache_path
+        self._cache: OrderedDict[str, Dict] = OrderedDict()
+        self._cache_dirty = False
 
         if not self.enabled:
             self.disabled_reason = "LLM is disabled (LLM_ENABLED=false)"
@@ -52,44 +182,117 @@ class LLMCategorizationAgent:
             self.client = None
             return
 
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = get_client()
+        self._load_cache()
 
     def is_enabled(self) -> bool:
         return bool(self.enabled and self.client is not None)
 
-    def categorize(self, transaction: Dict) -> Dict:
-        if not self.is_enabled():
-            return {
-                "category": "Uncategorized",
-                "confidence": 0.0,
-                "reason": self.disabled_reason or "LLM is not available",
-            }
+    def _unavailable(self) -> Dict:
+        return {
+            "category": "Uncategorized",
+            "confidence": 0.0,
+            "reason": self.disabled_reason or "LLM is not available",
+        }
+
+    def _load_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            data = loads_json(self.cache_path.read_bytes())
+        except Exception:
+            return
+        if not isinstance(data, dict) or any(data.get(k) != v for k, v in _CACHE_HEADER.items()):
+            return
+        entries = data.get("entries")
+        if isinstance(entries, dict):
+            for key, result in list(entries.items())[-CACHE_MAX_ENTRIES:]:
+                if isinstance(result, dict):
+                    self._cache[str(key)] = result
+
+    def save_cache(self) -> None:
+        """Write the result cache to cache_path (if set and anything new was cached)."""
+        if self.cache_path is None or not self._cache_dirty:
+            return
+        write_json({**_CACHE_HEADER, "entries": self._cache}, self.cache_path)
+        self._cache_dirty = False
+
+    def _cached(self, key: str) -> Dict | None:
+        result = self._cache.get(key)
+        if result is None:
+            return None
+        self._cache.move_to_end(key)
+        return dict(result)
 
-        prompt = USER_PROMPT_TEMPLATE.format(
+    def _remember(self, key: str, result: Dict) -> None:
+        if key.startswith("|"):
+            return  # no description: the answer rests on amount and date alone, don't reuse it
+        self._cache[key] = dict(result)
+        self._cache.move_to_end(key)
+        if len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+        self._cache_dirty = True
+
+    @staticmethod
+    def _messages(transaction: Dict) -> List[Dict]:
+        prompt = _USER_PROMPT.format(
             description=transaction.get("description", ""),
             amount=transaction.get("amount", 0),
             date=transaction.get("date", ""),
-            categories="\n".join(ALLOWED_CATEGORIES),
-        )
-
-        response = self.client.chat.completions.create(
-            model=OPENAI_CATEGORIZATION_MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
         )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
 
-        content = response.choices[0].message.content.strip()
+    @staticmethod
+    def _batch_messages(transactions: List[Dict]) -> List[Dict]:
+        rows = [
+            {
+                "i": i,
+                "description": transaction.get("description", ""),
+                "amount": transaction.get("amount", 0),
+                "date": transaction.get("date", ""),
+            }
+            for i, transaction in enumerate(transactions)
+        ]
+        prompt = _BATCH_USER_PROMPT.format(transactions=dumps_json(rows))
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
 
-        try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
+    def _request(self, transactions: List[Dict]) -> Dict:
+        """chat.completions.create() arguments for one request covering `transactions`."""
+        if len(transactions) == 1:
             return {
-                "category": "Uncategorized",
-                "confidence": 0.0,
-                "reason": "LLM returned invalid JSON"
+                "model": OPENAI_CATEGORIZATION_MODEL,
+                "messages": self._messages(transactions[0]),
+                "response_format": RESPONSE_FORMAT,
             }
+        return {
+            "model": OPENAI_CATEGORIZATION_MODEL,
+            "messages": self._batch_messages(transactions),
+            "response_format": BATCH_RESPONSE_FORMAT,
+        }
+
+    @staticmethod
+    def _load_json(content: str | None):
+        """
+        Decoded response content, or None if it isn't valid JSON.
+
+        The response schema makes that rare; it still happens when the model
+        refuses (content is None) or the reply is cut off at the token limit.
+        """
+        try:
+            return loads_json(content)
+        except (TypeError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _normalize(result) -> Dict | None:
+        if not isinstance(result, dict):
+            return None
 
         # Defensive normalization
         category = result.get("category", "Uncategorized")
@@ -104,3 +307,181 @@ class LLMCategorizationAgent:
             "confidence": confidence,
             "reason": reason
         }
+
+    def _finish(self, key: str, result: Dict | None) -> Dict:
+        if result is None:
+            return {
+                "category": "Uncategorized",
+                "confidence": 0.0,
+                "reason": "LLM returned invalid JSON"
+            }
+        self._remember(key, result)
+        return result
+
+    def _finish_request(self, keys: List[str], content: str | None) -> List[Dict]:
+        """Per-transaction results for a response to _request(), in `keys` order."""
+        data = self._load_json(content)
+        if len(keys) == 1:
+            return [self._finish(keys[0], self._normalize(data))]
+        items = data.get("results") if isinstance(data, dict) else None
+        by_index: Dict[int, Dict] = {}
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and isinstance(item.get("i"), int):
+                by_index.setdefault(item["i"], item)
+        return [self._finish(key, self._normalize(by_index.get(i))) for i, key in enumerate(keys)]
+
+    def _split_cached(self, transactions: List[Dict]) -> tuple:
+        """
+        (keys, answers, pending) for a batch: each transaction's cache_key(),
+        cached results by key, and one uncached transaction per remaining key.
+        """
+        keys = [cache_key(t) for t in transactions]
+        answers: Dict[str, object] = {}
+        pending: Dict[str, Dict] = {}
+        for key, transaction in zip(keys, transactions):
+            if key in answers or key in pending:
+                continue
+            cached = self._cached(key)
+            if cached is not None:
+                answers[key] = cached
+            else:
+                pending[key] = transaction
+        return keys, answers, pending
+
+    @staticmethod
+    def _chunks(keys: List[str]) -> List[List[str]]:
+        return [keys[i : i + BATCH_SIZE] for i in range(0, len(keys), BATCH_SIZE)]
+
+    def categorize(self, transaction: Dict) -> Dict:
+        if not self.is_enabled():
+            return self._unavailable()
+
+        key = cache_key(transaction)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        response = with_backoff(self.client.chat.completions.create, **self._request([transaction]))
+        return self._finish_request([key], response.choices[0].message.content)[0]
+
+    async def categorize_async(self, transaction: Dict) -> Dict:
+        if not self.is_enabled():
+            return self._unavailable()
+
+        key = cache_key(transaction)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        response = await with_backoff_async(get_async_client().chat.completions.create, **self._request([transaction]))
+        return self._finish_request([key], response.choices[0].message.content)[0]
+
+    def categorize_batch(self, transactions: List[Dict]) -> List[Dict]:
+        """
+        Categorize several transactions, BATCH_SIZE per request.
+
+        Cached and duplicate transactions are not resent. Results are in
+        input order.
+        """
+        if not self.is_enabled():
+            return [self._unavailable() for _ in transactions]
+
+        keys, answers, pending = self._split_cached(transactions)
+        for chunk in self._chunks(list(pending)):
+            response = with_backoff(self.client.chat.completions.create, **self._request([pending[k] for k in chunk]))
+            answers.update(zip(chunk, self._finish_request(chunk, response.choices[0].message.content)))
+        return [dict(answers[key]) for key in keys]
+
+    async def categorize_many(self, transactions: List[Dict], max_concurrency: int = 8) -> List:
+        """
+        categorize_batch() with up to `max_concurrency` requests in flight.
+
+        Results come back in input order. A request that fails yields its
+        exception in the slots of its transactions instead of cancelling the
+        rest of the batch.
+        """
+        if not self.is_enabled():
+            return [self._unavailable() for _ in transactions]
+
+        sem = asyncio.Semaphore(max(1, max_concurrency))
+        aclient = get_async_client()
+
+        async def send(chunk: List[str]) -> List[Dict]:
+            async with sem:
+                response = await with_backoff_async(
+                    aclient.chat.completions.create, **self._request([pending[k] for k in chunk])
+                )
+            return self._finish_request(chunk, response.choices[0].message.content)
+
+        keys, answers, pending = self._split_cached(transactions)
+        chunks = self._chunks(list(pending))
+        outcomes = await asyncio.gather(*(send(chunk) for chunk in chunks), return_exceptions=True)
+        for chunk, outcome in zip(chunks, outcomes):
+            answers.update(zip(chunk, [outcome] * len(chunk) if isinstance(outcome, Exception) else outcome))
+        return [a if isinstance(a, Exception) else dict(a) for a in (answers[key] for key in keys)]
+
+    def categorize_batch_api(self, transactions: List[Dict], work_dir: Path, poll_seconds: float = 30.0) -> List:
+        """
+        Categorize transactions through the OpenAI Batch API (offline runs).
+
+        Batch jobs are billed at a discount and have their own rate limits, at
+        the cost of latency: this blocks, polling every `poll_seconds`, until
+        the job finishes. Cached and duplicate transactions are not resubmitted.
+        Results are in input order; a transaction the job didn't answer gets a
+        RuntimeError in its slot, like a failed request in categorize_many().
+        """
+        if not self.is_enabled():
+            return [self._unavailable() for _ in transactions]
+
+        keys, answers, pending = self._split_cached(transactions)
+        if pending:
+            ids = {f"tx-{i}": key for i, key in enumerate(pending)}
+            input_path = Path(work_dir) / "batch_input.jsonl"
+            input_path.write_text(
+                "".join(
+                    dumps_json(
+                        {
+                            "custom_id": custom_id,
+                            "method": "POST",
+                            "url": "/v1/chat/completions",
+                            "body": self._request([pending[key]]),
+                        }
+                    )
+                    + "\n"
+                    for custom_id, key in ids.items()
+                ),
+                encoding="utf-8",
+            )
+            # Upload bytes rather than an open file so a retried upload sends the whole file again.
+            # Neither POST is retried after a timeout: a duplicate batch would be billed twice.
+            upload = (input_path.name, input_path.read_bytes())
+            input_file = with_backoff_create(self.client.files.create, file=upload, purpose="batch")
+            batch = with_backoff_create(
+                self.client.batches.create,
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_seconds)
+                batch = with_backoff(self.client.batches.retrieve, batch.id)
+
+            if batch.output_file_id:
+                for line in with_backoff(self.client.files.content, batch.output_file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    record = loads_json(line)
+                    key = ids.get(record.get("custom_id"))
+                    response = record.get("response") or {}
+                    if key is None or response.get("status_code") != 200:
+                        continue
+                    try:
+                        content = response["body"]["choices"][0]["message"]["content"]
+                        answers[key] = self._finish_request([key], content)[0]
+                    except Exception as e:
+                        answers[key] = e
+            missing = RuntimeError(f"Batch {batch.id} returned no result ({batch.status})")
+            for key in pending:
+                answers.setdefault(key, missing)
+
+        return [a if isinstance(a, Exception) else dict(a) for a in (answers[key] for key in keys)]
@@ -0,0 +1,67 @@
+"""
+Merchant Dictionary
+
+A deterministic merchant-substring -> category lookup that sits between the
+keyword rules and the LLM: transactions from well-known merchants get a
+category without an API call. Entries live in config/merchant_map.json.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import re
+from pathlib import Path
+
+from config.categories import ALLOWED_CATEGORIES
+
+MERCHANT_MAP_PATH = Path(__file__).resolve().parents[1] / "config" / "merchant_map.json"
+MERCHANT_MATCH_CONFIDENCE = 0.9
+
+
+def load_merchant_map(path: Path = MERCHANT_MAP_PATH) -> dict[str, str]:
+    """Lowercased key -> category; entries with unknown categories are skipped."""
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    allowed = set(ALLOWED_CATEGORIES)
+    return {str(k).lower(): v for k, v in raw.items() if str(k).strip() and v in allowed}
+
+
+def _pattern(keys) -> "re.Pattern[str] | None":
+    # One alternation scanned once per text instead of a substring test per entry.
+    # Keys must start at a word start ("rent" doesn't match "parent"); a key with
+    # a trailing space must also end at a word end. Longer keys go first so
+    # "uber eats" wins over "uber" at the same position.
+    ordered = sorted(keys, key=len, reverse=True)
+    return re.compile("(?<![a-z0-9])(?:" + "|".join(re.escape(k) for k in ordered) + ")") if ordered else None
+
+
+MERCHANT_MAP = load_merchant_map()
+_MERCHANT_PATTERN = _pattern(MERCHANT_MAP)
+
+
+@functools.lru_cache(maxsize=4096)
+def match_merchant(text: str) -> tuple[str, str] | None:
+    """(matched key, category) for the leftmost dictionary key in `text`, or None."""
+    if _MERCHANT_PATTERN is None:
+        return None
+    m = _MERCHANT_PATTERN.search(text.lower() + " ")
+    return (m.group(0), MERCHANT_MAP[m.group(0)]) if m else None
+
+
+def lookup(transaction: dict) -> dict | None:
+    """A routed result for `transaction` if its merchant/description is in the dictionary."""
+    hit = match_merchant(f"{transaction.get('merchant', '')} {transaction.get('description', '')}")
+    if hit is None:
+        return None
+    key, category = hit
+    return {
+        "category": category,
+        "confidence": MERCHANT_MATCH_CONFIDENCE,
+        "reason": f"Matched merchant dictionary entry '{key}'",
+        "source": "merchant_dict",
+    }
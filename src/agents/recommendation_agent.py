@@ -7,13 +7,16 @@ optionally upgraded with LLM wording when enabled.
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from agents._openai_client import get_client, with_backoff
+from agents.bill_agent import RECURRING_TAG
 from config.settings import LLM_ENABLED, OPENAI_API_KEY, OPENAI_INSIGHTS_MODEL
+from utils.helpers import coerce_transactions, contains_text, dumps_json, loads_json, true_mask, year_month_key
 
 
 @dataclass(frozen=True)
@@ -30,9 +33,7 @@ class RecommendationAgent:
         self._client = None
         if self.enabled and OPENAI_API_KEY:
             try:
-                from openai import OpenAI
-
-                self._client = OpenAI(api_key=OPENAI_API_KEY)
+                self._client = get_client()
             except Exception:
                 self._client = None
 
@@ -41,34 +42,29 @@ class RecommendationAgent:
         if df.empty:
             return out
 
-        d = df.copy()
-        d["amount"] = pd.to_numeric(d.get("amount"), errors="coerce")
-        d["date"] = pd.to_datetime(d.get("date"), errors="coerce")
-        d = d.dropna(subset=["amount", "date"])
-        if "category" not in d.columns:
-            d["category"] = "Uncategorized"
+        d = coerce_transactions(df)
+        amount = d["amount"].to_numpy(dtype=float)
+        category = d["category"] if "category" in d.columns else pd.Series("Uncategorized", index=d.index)
 
         # Top categories
-        by_cat = d.groupby("category", as_index=False).agg(total=("amount", "sum")).sort_values("total", ascending=False)
-        if not by_cat.empty:
-            top = by_cat.iloc[0]
+        totals = d["amount"].groupby(category, observed=True).sum()
+        if not totals.empty:
+            top_category = totals.idxmax()
             out.append(
                 Recommendation(
-                    title=f"Review your spending in {top['category']}",
-                    rationale=f"This is your highest-spend category at ${float(top['total']):,.2f}. Identify 1–2 easy cuts.",
+                    title=f"Review your spending in {top_category}",
+                    rationale=f"This is your highest-spend category at ${float(totals[top_category]):,.2f}. Identify 1–2 easy cuts.",
                     impact="high",
-                    category=str(top["category"]),
+                    category=str(top_category),
                 )
             )
 
         # Recurring/subscription hints (if tags exist)
         if "tags" in d.columns:
-            recurring = d[d["tags"].astype(str).str.contains("recurring", na=False)]
-            if not recurring.empty:
-                monthly = recurring.copy()
-                monthly["year_month"] = monthly["date"].dt.strftime("%Y-%m")
-                by_month = monthly.groupby("year_month", as_index=False).agg(total=("amount", "sum"))
-                avg = float(by_month["total"].mean()) if not by_month.empty else float(recurring["amount"].sum())
+            recurring = contains_text(d["tags"], RECURRING_TAG)
+            if recurring.any():
+                by_month = pd.Series(amount[recurring]).groupby(year_month_key(d["date"])[recurring]).sum()
+                avg = float(by_month.mean())
                 out.append(
                     Recommendation(
                         title="Audit recurring charges",
@@ -79,23 +75,23 @@ class RecommendationAgent:
 
         # Anomalies
         if "is_anomaly" in d.columns:
-            anom = d[d["is_anomaly"] == True]  # noqa: E712
-            if not anom.empty:
+            anom_count = int(np.count_nonzero(true_mask(d["is_anomaly"])))
+            if anom_count:
                 out.append(
                     Recommendation(
                         title="Review flagged anomalies",
-                        rationale=f"{len(anom)} transactions were flagged as unusual. Verify they’re legitimate and adjust alerts if needed.",
+                        rationale=f"{anom_count} transactions were flagged as unusual. Verify they’re legitimate and adjust alerts if needed.",
                         impact="medium",
                     )
                 )
 
         # Uncategorized cleanup
-        unc = d[d["category"] == "Uncategorized"]
-        if len(unc) >= 2:
+        unc_count = int(np.count_nonzero(category.to_numpy() == "Uncategorized"))
+        if unc_count >= 2:
             out.append(
                 Recommendation(
                     title="Improve categorization rules",
-                    rationale=f"{len(unc)} transactions are Uncategorized. Add a rule for common merchants to reduce future LLM usage and improve reporting.",
+                    rationale=f"{unc_count} transactions are Uncategorized. Add a rule for common merchants to reduce future LLM usage and improve reporting.",
                     impact="medium",
                     category="Uncategorized",
                 )
@@ -120,14 +116,15 @@ class RecommendationAgent:
                 "You are a personal finance coach. Rewrite and enrich these recommendations. "
                 "Return JSON: {recommendations:[{title,rationale,impact,category}]}. "
                 "Keep it concise and actionable.\n\n"
-                f"Input JSON:\n{json.dumps(payload, indent=2)}"
+                f"Input JSON:\n{dumps_json(payload, indent=True)}"
             )
-            resp = self._client.chat.completions.create(
+            resp = with_backoff(
+                self._client.chat.completions.create,
                 model=OPENAI_INSIGHTS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
             )
             content = (resp.choices[0].message.content or "").strip()
-            enhanced = json.loads(content)
+            enhanced = loads_json(content)
             if isinstance(enhanced, dict) and "recommendations" in enhanced:
                 return enhanced
         except Exception:
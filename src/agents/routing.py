@@ -1,25 +1,55 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from agents.merchant_dictionary import lookup as merchant_lookup
+from config.settings import LLM_MAX_CONCURRENCY
+
 CONFIDENCE_THRESHOLD = 0.6
+NO_LLM_REASON = "Rule confidence below threshold, but LLM is unavailable/disabled"
 
-def route_transaction(rule_result, transaction, llm_agent):
-    if rule_result["confidence"] >= CONFIDENCE_THRESHOLD:
-        return {
-            **rule_result,
-            "source": "rule"
-        }
 
-    # Escalate to LLM (if available)
-    llm_available = (
+def _llm_available(llm_agent) -> bool:
+    return (
         llm_agent is not None
         and hasattr(llm_agent, "categorize")
         and (not hasattr(llm_agent, "is_enabled") or llm_agent.is_enabled())
     )
 
-    if not llm_available:
+
+def error_result(error: Exception) -> dict:
+    return {
+        "category": "Uncategorized",
+        "confidence": 0.0,
+        "source": "error",
+        "reason": f"Categorization error: {str(error)}"
+    }
+
+
+def _rule_only(rule_result):
+    """The routed result when the LLM won't be called for this row."""
+    if rule_result["confidence"] >= CONFIDENCE_THRESHOLD:
         return {
             **rule_result,
-            "source": "rule_no_llm",
-            "reason": "Rule confidence below threshold, but LLM is unavailable/disabled",
+            "source": "rule"
         }
+    return {
+        **rule_result,
+        "source": "rule_no_llm",
+        "reason": NO_LLM_REASON,
+    }
+
+
+def route_transaction(rule_result, transaction, llm_agent):
+    # Escalate to LLM only below the threshold and if available
+    if rule_result["confidence"] >= CONFIDENCE_THRESHOLD or not _llm_available(llm_agent):
+        return _rule_only(rule_result)
+
+    # Well-known merchants are settled by the dictionary instead of an API call
+    merchant_result = merchant_lookup(transaction)
+    if merchant_result is not None:
+        return {**merchant_result, "rule_confidence": rule_result["confidence"]}
 
     print(f"[ESCALATING TO LLM] {transaction['description']}")
     llm_result = llm_agent.categorize(transaction)
@@ -29,3 +59,100 @@ def route_transaction(rule_result, transaction, llm_agent):
         "source": "llm",
         "rule_confidence": rule_result["confidence"]
     }
+
+
+async def route_transactions(
+    rule_results, transactions, llm_agent, max_concurrency=LLM_MAX_CONCURRENCY, batch_dir=None
+):
+    """
+    route_transaction() over a batch, issuing the LLM escalations concurrently.
+
+    LLM availability is checked once for the whole batch; rows the rules
+    settle (or that can't escalate) never touch the LLM agent, rows the
+    merchant dictionary recognizes are settled without it, and only the
+    escalated subset is awaited, via llm_agent.categorize_many when the agent
+    has it. With `batch_dir`, the escalations are instead submitted
+    as one OpenAI Batch API job (llm_agent.categorize_batch_api), with its
+    files written there. Results are in input order; a row whose routing
+    fails gets an "error" result instead of aborting the batch.
+    """
+    results = [None] * len(rule_results)
+    escalated = []
+    can_escalate = _llm_available(llm_agent)
+
+    for i, (rule_result, transaction) in enumerate(zip(rule_results, transactions)):
+        try:
+            if can_escalate and rule_result["confidence"] < CONFIDENCE_THRESHOLD:
+                merchant_result = merchant_lookup(transaction)
+                if merchant_result is not None:
+                    results[i] = {**merchant_result, "rule_confidence": rule_result["confidence"]}
+                    continue
+                print(f"[ESCALATING TO LLM] {transaction['description']}")
+                escalated.append(i)
+            else:
+                results[i] = _rule_only(rule_result)
+        except Exception as e:
+            results[i] = error_result(e)
+
+    if not escalated:
+        return results
+
+    batch = [transactions[i] for i in escalated]
+    if batch_dir is not None and hasattr(llm_agent, "categorize_batch_api"):
+        try:
+            llm_results = await asyncio.to_thread(llm_agent.categorize_batch_api, batch, batch_dir)
+        except Exception as e:
+            llm_results = [e] * len(batch)
+    elif hasattr(llm_agent, "categorize_many"):
+        llm_results = await llm_agent.categorize_many(batch, max_concurrency=max_concurrency)
+    else:
+        llm_results = []
+        for transaction in batch:
+            try:
+                llm_results.append(llm_agent.categorize(transaction))
+            except Exception as e:
+                llm_results.append(e)
+
+    for i, llm_result in zip(escalated, llm_results):
+        if isinstance(llm_result, Exception):
+            results[i] = error_result(llm_result)
+        else:
+            results[i] = {
+                **llm_result,
+                "source": "llm",
+                "rule_confidence": rule_results[i]["confidence"]
+            }
+    return results
+
+
+async def route_frame(
+    rule_df, transactions_df, llm_agent, max_concurrency=LLM_MAX_CONCURRENCY, batch_dir=None
+):
+    """
+    route_transactions() for a frame of rule results, returned as a frame.
+
+    Rows that stay with the rules get their source/reason columns set with
+    column ops; only rows that escalate are turned into dicts and sent
+    through route_transactions(). The result is aligned to rule_df.index
+    (rule_confidence is added when any row escalates).
+    """
+    confident = rule_df["confidence"].to_numpy(dtype=float) >= CONFIDENCE_THRESHOLD
+    out = rule_df.assign(
+        source=np.where(confident, "rule", "rule_no_llm"),
+        reason=rule_df["reason"].where(confident, NO_LLM_REASON),
+    )
+    if confident.all() or not _llm_available(llm_agent):
+        return out
+
+    escalate = ~confident
+    routed = await route_transactions(
+        rule_df[escalate].to_dict(orient="records"),
+        transactions_df[escalate].to_dict(orient="records"),
+        llm_agent,
+        max_concurrency=max_concurrency,
+        batch_dir=batch_dir,
+    )
+    routed_df = pd.DataFrame(routed, index=out.index[escalate])
+    out = out.reindex(columns=out.columns.union(routed_df.columns, sort=False))
+    out.loc[routed_df.index, routed_df.columns] = routed_df
+    return out
@@ -15,6 +15,15 @@ def _env_flag(name: str, default: bool) -> bool:
 # If the key is missing, the app should still run in non-LLM mode.
 LLM_ENABLED = _env_flag("LLM_ENABLED", default=bool(OPENAI_API_KEY))
 
+# Write output CSVs with pyarrow's multi-threaded writer (same data, different quoting)
+FAST_IO = _env_flag("PFA_FAST_IO", default=False)
+
 # Default models (can be overridden per-agent if needed)
 OPENAI_CATEGORIZATION_MODEL = os.getenv("OPENAI_CATEGORIZATION_MODEL", "gpt-5-mini")
 OPENAI_INSIGHTS_MODEL = os.getenv("OPENAI_INSIGHTS_MODEL", "gpt-5-mini")
+
+# Max LLM categorization requests in flight at once (bounded to stay under rate limits)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Transactions categorized per LLM request (one round trip for the whole group)
+LLM_BATCH_SIZE = max(1, int(os.getenv("LLM_BATCH_SIZE", "32")))
@@ -2,15 +2,15 @@
 # Date: January 07, 2026
 # Description: Main entry point for the Personal Finance Agent application.
 
-import pandas as pd
 import argparse
-import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from agents.ingestion_agent import IngestionAgent
 from agents.categorization_agent import CategorizationAgent
 from agents.llm_categorization_agent import LLMCategorizationAgent
-from agents.routing import route_transaction
+from agents.routing import route_frame
 from agents.anomaly_detection_agent import AnomalyDetectionAgent
 from agents.enrichment_agent import EnrichmentAgent
 from agents.bill_agent import BillAgent
@@ -20,8 +20,10 @@ from agents.forecasting_agent import ForecastingAgent, ForecastConfig
 from agents.budget_agent import BudgetAgent
 from agents.health_agent import FinancialHealthAgent
 from agents.chat_agent import ChatAgent
+from config.settings import FAST_IO
 from tools.expense_stats import ExpenseAnalytics
 from tools.ai_visualization import AIVisualizationTool
+from utils.helpers import coerce_transactions, write_json, write_table, write_text
 
 
 def main():
@@ -30,6 +32,16 @@ def main():
     parser.add_argument("--ask", type=str, default="", help="Ask a question about your finances (CLI chat).")
     parser.add_argument("--months-ahead", type=int, default=3, help="Forecast months ahead.")
     parser.add_argument("--dashboard", action="store_true", help="Generate an offline HTML dashboard.")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Send LLM categorizations as one OpenAI Batch API job (cheaper, but waits for the job to finish).",
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Write categorized transactions and the monthly summary as Parquet instead of CSV (needs pyarrow).",
+    )
     args = parser.parse_args()
 
     BASE_DIR = Path(__file__).resolve().parents[1]
@@ -41,39 +53,28 @@ def main():
 
     ingestion_agent = IngestionAgent(input_path)
     rule_agent = CategorizationAgent()
-    llm_agent = LLMCategorizationAgent(enabled=not args.no_llm)
-
-    transactions = ingestion_agent.load_transactions()
-
-    results = []
-    llm_calls = 0
-
-    for transaction in transactions:
-        transaction_dict = dict(transaction)
-
-        try:
-            rule_result = rule_agent.categorize(transaction)
-
-            final_result = route_transaction(
-                rule_result=rule_result,
-                transaction=transaction_dict,
-                llm_agent=llm_agent
-            )
-
-            if final_result.get("source") == "llm":
-                llm_calls += 1
-
-        except Exception as e:
-            final_result = {
-                "category": "Uncategorized",
-                "confidence": 0.0,
-                "source": "error",
-                "reason": f"Categorization error: {str(e)}"
-            }
-
-        results.append({**transaction, **final_result})
-
-    output_df = pd.DataFrame(results)
+    llm_agent = LLMCategorizationAgent(enabled=not args.no_llm, cache_path=processed_dir / "llm_cache.json")
+
+    # The frame is read once and used as-is
+    transactions_df = ingestion_agent.load_dataframe()
+
+    # Rule pass runs vectorized over the whole batch; only rule-uncertain rows
+    # become dicts for the LLM, and those requests run concurrently
+    rule_df = rule_agent.categorize_df(transactions_df)
+    routed_df = asyncio.run(
+        route_frame(
+            rule_df,
+            transactions_df,
+            llm_agent,
+            batch_dir=processed_dir if args.batch else None,
+        )
+    )
+    llm_agent.save_cache()
+    llm_calls = int((routed_df["source"] == "llm").sum())
+
+    # Attach the routing columns to the transactions frame column-wise instead of
+    # merging a dict per row; routing fields override same-named input columns.
+    output_df = transactions_df.assign(**{col: routed_df[col] for col in routed_df.columns})
     
     # Detect anomalies
     anomaly_agent = AnomalyDetectionAgent()
@@ -88,85 +89,139 @@ def main():
     # Detect recurring bills/subscriptions (offline)
     bill_agent = BillAgent()
     output_df = bill_agent.mark_recurring(output_df)
-    
-    output_df.to_csv(output_path, index=False)
 
-    print(f"Looking for input file at: {input_path}")
-    print(f"Processed {len(output_df)} transactions.")
-    print(f"LLM used for {llm_calls} transactions.")
-    print(f"Saved output to {output_path}")
+    # Categories are final from here on: as a categorical, the many downstream
+    # groupbys hash integer codes instead of strings
+    output_df["category"] = output_df["category"].astype("category")
     
-    # Generate and display analytics dashboard
-    print("\n")
-    analytics = ExpenseAnalytics(output_df)
-    analytics_report = analytics.generate_summary_report()
-    print(analytics_report)
-    
-    # Generate and display anomaly detection report
-    print("\n")
+    # reason_mask is internal bookkeeping for the anomaly report, not part of the file schema
+    output_path = write_table(
+        output_df.drop(columns="reason_mask", errors="ignore"), output_path, parquet=args.parquet, fast_csv=FAST_IO
+    )
+
+    # The anomaly report quotes dates as read, so it is built before parsing
     anomaly_report = anomaly_agent.generate_anomaly_report(output_df)
-    print(anomaly_report)
-    
-    # Save analytics summary to file
-    analytics_output_path = BASE_DIR / "data" / "processed" / "spending_summary.txt"
-    analytics.save_summary_to_file(analytics_output_path)
-    print(f"\nAnalytics summary saved to: {analytics_output_path}")
-    
-    # Save monthly summary to CSV file
-    monthly_summary = analytics.get_monthly_summary()
-    monthly_output_path = BASE_DIR / "data" / "processed" / "monthly_summary.csv"
-    if not monthly_summary.empty:
-        monthly_summary.to_csv(monthly_output_path, index=False)
-        print(f"Monthly summary saved to: {monthly_output_path}")
-    else:
-        print(f"Warning: No monthly summary data to save.")
-    
-    # Save anomaly report to file
-    anomaly_output_path = BASE_DIR / "data" / "processed" / "anomaly_report.txt"
-    anomaly_output_path.write_text(anomaly_report, encoding='utf-8')
-    print(f"Anomaly report saved to: {anomaly_output_path}")
-
-    # Save bill calendar
-    bill_calendar = bill_agent.build_bill_calendar(output_df)
-    bill_calendar_path = processed_dir / "bill_calendar.csv"
-    bill_calendar.to_csv(bill_calendar_path, index=False)
-    print(f"Bill calendar saved to: {bill_calendar_path}")
-
-    # AI insights + recommendations
-    insights_agent = InsightsAgent(enabled=(not args.no_llm))
-    insights = insights_agent.generate_insights(output_df)
-    insights_path = processed_dir / "ai_insights.json"
-    insights_path.write_text(json.dumps(insights, indent=2), encoding="utf-8")
-    print(f"AI insights saved to: {insights_path}")
 
-    rec_agent = RecommendationAgent(enabled=(not args.no_llm))
-    recs = rec_agent.generate_recommendations(output_df)
-    recs_path = processed_dir / "ai_recommendations.json"
-    recs_path.write_text(json.dumps(recs, indent=2), encoding="utf-8")
-    print(f"AI recommendations saved to: {recs_path}")
+    # Parse dates once for everything downstream; each agent's coercion then
+    # reuses the datetime column instead of re-parsing the strings. (The file
+    # written above keeps the dates exactly as they were read.)
+    output_df = coerce_transactions(output_df, dropna=False)
 
-    # Forecasting
+    # The agents below only read output_df, so they run in the background while
+    # the reports are built: the LLM-backed ones overlap their network waits,
+    # the others spend most of their time in pandas/NumPy code that releases the GIL.
+    insights_agent = InsightsAgent(enabled=(not args.no_llm))
+    rec_agent = RecommendationAgent(enabled=(not args.no_llm))
     forecasting_agent = ForecastingAgent(config=ForecastConfig(months_ahead=max(1, args.months_ahead)))
-    forecast_df = forecasting_agent.forecast_spending(output_df)
-    forecast_path = processed_dir / "spending_forecast.csv"
-    forecast_df.to_csv(forecast_path, index=False)
-    print(f"Spending forecast saved to: {forecast_path}")
-
-    # Smart budget + budget status (uses YAML rules if present; otherwise generates from history)
-    budget_agent = BudgetAgent()
-    budget_rules_path = BASE_DIR / "data" / "rules" / "budget_rules.yaml"
-    budgets = budget_agent.load_budget_rules(budget_rules_path) or budget_agent.generate_smart_budget(output_df).get("budgets", {})
-    budget_status = budget_agent.budget_status(output_df, budgets)
-    budget_status_path = processed_dir / "budget_status.json"
-    budget_status_path.write_text(json.dumps(budget_status, indent=2), encoding="utf-8")
-    print(f"Budget status saved to: {budget_status_path}")
-
-    # Financial health score
-    health_agent = FinancialHealthAgent()
-    health = health_agent.calculate(output_df, budget_status=budget_status)
-    health_path = processed_dir / "financial_health.json"
-    health_path.write_text(json.dumps(health, indent=2), encoding="utf-8")
-    print(f"Financial health saved to: {health_path}")
+
+    # Artifact writes go to a background thread while the next result is
+    # computed; the "saved to" lines are printed, in order, once they finish.
+    io_pool = ThreadPoolExecutor(max_workers=2)
+    saved = []  # messages, or (label, future of the path written)
+
+    def save_in_background(label, write, *write_args, **write_kwargs):
+        saved.append((label, io_pool.submit(write, *write_args, **write_kwargs)))
+
+    agent_pool = ThreadPoolExecutor(max_workers=4)
+    try:
+        bill_calendar_future = agent_pool.submit(bill_agent.build_bill_calendar, output_df)
+        insights_future = agent_pool.submit(insights_agent.generate_insights, output_df)
+        recs_future = agent_pool.submit(rec_agent.generate_recommendations, output_df)
+        forecast_future = agent_pool.submit(forecasting_agent.forecast_spending, output_df)
+
+        print(f"Looking for input file at: {input_path}")
+        print(f"Processed {len(output_df)} transactions.")
+        print(f"LLM used for {llm_calls} transactions.")
+        print(f"Saved output to {output_path}")
+
+        # Generate and display analytics dashboard
+        print("\n")
+        analytics = ExpenseAnalytics(output_df)
+        analytics_report = analytics.generate_summary_report()
+        print(analytics_report)
+
+        # Generate and display anomaly detection report
+        print("\n")
+        print(anomaly_report)
+
+        # Save analytics summary to file
+        analytics_output_path = BASE_DIR / "data" / "processed" / "spending_summary.txt"
+        save_in_background("\nAnalytics summary", write_text, analytics_report, analytics_output_path)
+
+        # Save monthly summary (CSV, or Parquet with --parquet)
+        monthly_summary = analytics.get_monthly_summary()
+        monthly_output_path = BASE_DIR / "data" / "processed" / "monthly_summary.csv"
+        if not monthly_summary.empty:
+            save_in_background(
+                "Monthly summary",
+                write_table,
+                monthly_summary,
+                monthly_output_path,
+                parquet=args.parquet,
+                fast_csv=FAST_IO,
+            )
+        else:
+            saved.append("Warning: No monthly summary data to save.")
+
+        # Save anomaly report to file
+        anomaly_output_path = BASE_DIR / "data" / "processed" / "anomaly_report.txt"
+        save_in_background("Anomaly report", write_text, anomaly_report, anomaly_output_path)
+
+        # Save bill calendar
+        bill_calendar = bill_calendar_future.result()
+        bill_calendar_path = processed_dir / "bill_calendar.csv"
+        save_in_background("Bill calendar", write_table, bill_calendar, bill_calendar_path, fast_csv=FAST_IO)
+
+        # AI insights + recommendations
+        insights = insights_future.result()
+        insights_path = processed_dir / "ai_insights.json"
+        save_in_background("AI insights", write_json, insights, insights_path, indent=True)
+
+        recs = recs_future.result()
+        recs_path = processed_dir / "ai_recommendations.json"
+        save_in_background("AI recommendations", write_json, recs, recs_path, indent=True)
+
+        # Forecasting
+        forecast_df = forecast_future.result()
+        forecast_path = processed_dir / "spending_forecast.csv"
+        save_in_background("Spending forecast", write_table, forecast_df, forecast_path, fast_csv=FAST_IO)
+
+        # Smart budget + budget status (uses YAML rules if present; otherwise generates from history)
+        budget_agent = BudgetAgent()
+        budget_rules_path = BASE_DIR / "data" / "rules" / "budget_rules.yaml"
+        budgets = budget_agent.load_budget_rules(budget_rules_path) or budget_agent.generate_smart_budget(
+            output_df
+        ).get("budgets", {})
+        budget_status = budget_agent.budget_status(output_df, budgets)
+        budget_status_path = processed_dir / "budget_status.json"
+        save_in_background("Budget status", write_json, budget_status, budget_status_path, indent=True)
+
+        # Financial health score
+        health_agent = FinancialHealthAgent()
+        health = health_agent.calculate(output_df, budget_status=budget_status)
+        health_path = processed_dir / "financial_health.json"
+        save_in_background("Financial health", write_json, health, health_path, indent=True)
+    finally:
+        # Nothing is left queued or running in the background (LLM-backed
+        # agents included) if a step above raises; on success all are done.
+        agent_pool.shutdown(cancel_futures=True)
+        # Writes already submitted still finish and are reported (failures
+        # included) even when a step above raised.
+        io_pool.shutdown()
+        write_errors = []
+        for entry in saved:
+            if isinstance(entry, str):
+                print(entry)
+                continue
+            label, future = entry
+            error = future.exception()
+            if error is None:
+                print(f"{label} saved to: {future.result()}")
+            else:
+                print(f"{label} could not be saved: {error}")
+                write_errors.append(error)
+    if write_errors:
+        raise write_errors[0]
 
     # Optional offline HTML dashboard
     if args.dashboard:
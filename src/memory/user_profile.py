@@ -7,11 +7,12 @@ This is intentionally lightweight and file-based.
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Any
 
+from utils.helpers import loads_json, write_json
+
 
 @dataclass
 class UserProfile:
@@ -27,10 +28,10 @@ class UserProfile:
     @classmethod
     def load(cls, path: Path) -> "UserProfile":
         try:
-            raw = path.read_text(encoding="utf-8").strip()
+            raw = path.read_bytes().strip()
             if not raw:
                 return cls()
-            data = json.loads(raw)
+            data = loads_json(raw)
             return cls(
                 user_id=str(data.get("user_id", "default")),
                 monthly_income=float(data["monthly_income"]) if data.get("monthly_income") is not None else None,
@@ -40,5 +41,5 @@ class UserProfile:
             return cls()
 
     def save(self, path: Path) -> None:
-        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        write_json(self.to_dict(), path, indent=True)
 
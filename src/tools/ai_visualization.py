@@ -14,10 +14,14 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from tools.expense_stats import ExpenseAnalytics
 
+# HTML-escapes in one str.translate pass instead of a str.replace per character
+_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})
+
 
 @dataclass(frozen=True)
 class DashboardConfig:
@@ -30,19 +34,34 @@ class AIVisualizationTool:
 
     @staticmethod
     def _escape(s: str) -> str:
-        return (
-            s.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-            .replace("'", "&#39;")
-        )
+        return s.translate(_ESCAPE_TABLE)
 
     @staticmethod
-    def _df_to_html_table(df: pd.DataFrame) -> str:
+    def _format_column(values: pd.Series) -> list[str]:
+        """Cell texts for one column, with floats at a shared precision like DataFrame.to_html."""
+        if not pd.api.types.is_float_dtype(values):
+            return [AIVisualizationTool._escape(str(v)) for v in values.tolist()]
+        arr = values.to_numpy(dtype=float)
+        finite = arr[np.isfinite(arr)]
+        decimals = next((d for d in range(1, 6) if np.array_equal(finite.round(d), finite.round(6))), 6)
+        return ["NaN" if np.isnan(v) else f"{v:.{decimals}f}" for v in arr.tolist()]
+
+    @classmethod
+    def _df_to_html_table(cls, df: pd.DataFrame) -> str:
+        # Assembled directly from the columns; to_html's formatter machinery is
+        # far heavier than these few small tables need.
         if df.empty:
             return "<p><em>No data</em></p>"
-        return df.to_html(index=False, border=0, classes="table")
+        head = "".join(f"      <th>{cls._escape(str(c))}</th>\n" for c in df.columns)
+        columns = [cls._format_column(df[c]) for c in df.columns]
+        body = "".join(
+            "    <tr>\n" + "".join(f"      <td>{v}</td>\n" for v in row) + "    </tr>\n" for row in zip(*columns)
+        )
+        return (
+            '<table class="dataframe table">\n'
+            f'  <thead>\n    <tr style="text-align: right;">\n{head}    </tr>\n  </thead>\n'
+            f"  <tbody>\n{body}  </tbody>\n</table>"
+        )
 
     @staticmethod
     def _svg_bar(categories: pd.DataFrame) -> str:
@@ -53,25 +72,25 @@ class AIVisualizationTool:
         width = 640
         bar_h = 18
         gap = 6
-        height = len(categories) * (bar_h + gap) + 10
-        y = 10
-        bars = []
-        for _, row in categories.iterrows():
-            label = str(row.get("category", ""))
-            val = float(row.get("total_spent", 0.0))
-            w = int((val / maxv) * (width - 220))
-            bars.append(
-                f'<text x="0" y="{y+14}" font-size="12" fill="#222">{label}</text>'
-                f'<rect x="210" y="{y}" width="{w}" height="{bar_h}" fill="#4f46e5" rx="3" />'
-                f'<text x="{210+w+8}" y="{y+14}" font-size="12" fill="#222">${val:,.2f}</text>'
-            )
-            y += bar_h + gap
+        n = len(categories)
+        height = n * (bar_h + gap) + 10
+
+        # Columns as plain arrays, widths computed in one vectorized step
+        labels = [str(v) for v in categories["category"].tolist()] if "category" in categories.columns else [""] * n
+        vals = categories["total_spent"].to_numpy(dtype=float) if "total_spent" in categories.columns else np.zeros(n)
+        widths = ((vals / maxv) * (width - 220)).tolist()
+        bars = [
+            f'<text x="0" y="{y+14}" font-size="12" fill="#222">{label}</text>'
+            f'<rect x="210" y="{y}" width="{w}" height="{bar_h}" fill="#4f46e5" rx="3" />'
+            f'<text x="{210+w+8}" y="{y+14}" font-size="12" fill="#222">${val:,.2f}</text>'
+            for label, val, w, y in zip(labels, vals.tolist(), map(int, widths), range(10, height, bar_h + gap))
+        ]
         return f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}">' + "".join(bars) + "</svg>"
 
     def generate_smart_dashboard(self, transactions_df: pd.DataFrame, output_path: Path) -> Path:
-        analytics = ExpenseAnalytics(transactions_df)
-        top = analytics.get_category_summary().head(self.config.top_n)
-        monthly = analytics.get_monthly_summary()
+        summaries = ExpenseAnalytics.summaries_for(transactions_df)
+        top = summaries["category_summary"].head(self.config.top_n)
+        monthly = summaries["monthly_summary"]
 
         html = f"""<!doctype html>
 <html lang="en">
@@ -3,85 +3,176 @@ Spending Analytics and Statistics Module
 Generates comprehensive spending insights from categorized transactions.
 """
 
+import threading
+
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Any, Dict, List
 from pathlib import Path
 
+from utils.helpers import coerce_transactions, format_year_month, frame_fingerprint
+
+# Columns the summaries read; summaries_for() fingerprints only these.
+SUMMARY_COLUMNS = ['amount', 'category', 'date', 'year_month', 'merchant']
+SUMMARY_CACHE_MAX_ENTRIES = 8
+_SUMMARY_CACHE: Dict[bytes, Dict[str, Any]] = {}
+_SUMMARY_CACHE_LOCK = threading.Lock()  # agents call summaries_for() from worker threads
+
 
 class ExpenseAnalytics:
     """Generate spending analytics and insights from categorized transactions."""
     
-    def __init__(self, transactions_df: pd.DataFrame):
+    def __init__(self, transactions_df: pd.DataFrame, *, copy: bool = False):
         """
         Initialize analytics with transaction dataframe.
         
         Args:
             transactions_df: DataFrame with columns including 'amount', 'category', 'date'
+            copy: Take a private deep copy of the data. Not needed to protect the
+                caller's frame (derived columns go on a shallow copy); only for
+                callers that will mutate transactions_df in place afterwards.
         """
-        self.df = transactions_df.copy()
+        self.df = transactions_df.copy() if copy else transactions_df
+        self._summaries = None
+        self._month_keys = False
         self._prepare_data()
+
+    @classmethod
+    def summaries_for(cls, transactions_df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        compute_all() for a dataframe, shared across callers.
+
+        Results are cached by the content of the columns they depend on, so
+        callers handed the same transactions reuse one aggregation pass. Each
+        call gets its own copies of the (small, aggregated) summary frames, so
+        a caller editing them can't change what the next caller sees.
+        """
+        key = frame_fingerprint(transactions_df, SUMMARY_COLUMNS)
+        with _SUMMARY_CACHE_LOCK:
+            summaries = _SUMMARY_CACHE.get(key) if key is not None else None
+        if summaries is None:
+            summaries = cls(transactions_df).compute_all()
+            if key is not None:
+                with _SUMMARY_CACHE_LOCK:
+                    if key not in _SUMMARY_CACHE and len(_SUMMARY_CACHE) >= SUMMARY_CACHE_MAX_ENTRIES:
+                        del _SUMMARY_CACHE[next(iter(_SUMMARY_CACHE))]
+                    _SUMMARY_CACHE[key] = summaries
+        return {k: v.copy() if isinstance(v, pd.DataFrame) else v for k, v in summaries.items()}
     
     def _prepare_data(self):
         """Prepare data for analysis."""
-        # Ensure amount is numeric
-        self.df['amount'] = pd.to_numeric(self.df['amount'], errors='coerce')
-        
-        # Parse date if it's a string
-        if 'date' in self.df.columns:
-            self.df['date'] = pd.to_datetime(self.df['date'], errors='coerce')
-            self.df['month'] = self.df['date'].dt.to_period('M')
-            self.df['year_month'] = self.df['date'].dt.strftime('%Y-%m')
+        # Numeric amount and parsed date on a shallow copy: the caller's frame
+        # isn't copied or mutated, and already-typed columns are reused as-is.
+        has_date = 'date' in self.df.columns
+        self.df = coerce_transactions(self.df, dropna=False, parse_dates=has_date)
+
+        # Months as year*100+month numbers (NaN for missing dates), rendered as
+        # "YYYY-MM" only in the summaries; no per-row Period or strftime objects.
+        if has_date:
+            dates = self.df['date']
+            self.df['year_month'] = dates.dt.year * 100 + dates.dt.month
+            self._month_keys = True
+
+    def _month_labels(self, months) -> list:
+        if not self._month_keys:
+            return list(months)
+        return [format_year_month(m) for m in months]
     
+    def compute_all(self) -> Dict[str, Any]:
+        """
+        Every summary the getters return, from one aggregation pass.
+
+        A single groupby over (category, year_month, merchant) produces
+        per-cell sums and counts; the category, monthly, category-by-month
+        and merchant summaries are rolled up from those cells instead of
+        scanning the transactions once per summary.
+        """
+        if self._summaries is None:
+            self._summaries = self._compute_summaries()
+        return self._summaries
+
+    def _compute_summaries(self) -> Dict[str, Any]:
+        keys = [k for k in ('category', 'year_month', 'merchant') if k in self.df.columns]
+        if keys:
+            cells = self.df.groupby(keys, dropna=False, sort=False, observed=True)['amount'].agg(['sum', 'count'])
+            total = cells['sum'].sum()
+        else:
+            cells = None
+            total = self.df['amount'].sum()
+
+        if 'category' in keys:
+            # Sort, averages and percentages on the aggregated arrays, then one frame
+            by_category = cells.groupby(level='category', observed=True).sum()
+            totals = by_category['sum'].to_numpy()
+            counts = by_category['count'].to_numpy()
+            spent = totals.round(2)
+            order = np.argsort(-spent, kind='stable')
+            spent = spent[order]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                avg = (totals / counts)[order].round(2)
+                percentage = (spent / spent.sum() * 100).round(1)
+            category_summary = pd.DataFrame({
+                'category': by_category.index.to_numpy()[order],
+                'total_spent': spent,
+                'transaction_count': counts[order],
+                'avg_transaction': avg,
+                'percentage': percentage,
+            }, index=order)
+        else:
+            category_summary = pd.DataFrame(
+                columns=['category', 'total_spent', 'transaction_count', 'avg_transaction', 'percentage']
+            )
+
+        if 'year_month' in keys:
+            by_month = cells.groupby(level='year_month').sum()
+            monthly = pd.DataFrame({
+                'month': self._month_labels(by_month.index),
+                'total_spent': by_month['sum'].to_numpy(),
+                'transaction_count': by_month['count'].to_numpy(),
+            }).round(2)
+            monthly = monthly.sort_values('month')
+        else:
+            monthly = pd.DataFrame()
+
+        if 'category' in keys and 'year_month' in keys:
+            by_category_month = cells.groupby(level=['category', 'year_month'], observed=True).sum()
+            category_month = pd.DataFrame({
+                'category': by_category_month.index.get_level_values('category'),
+                'month': self._month_labels(by_category_month.index.get_level_values('year_month')),
+                'total_spent': by_category_month['sum'].to_numpy(),
+            }).round(2)
+        else:
+            category_month = pd.DataFrame()
+
+        if 'merchant' in keys:
+            by_merchant = cells.groupby(level='merchant').sum()
+            merchants = pd.DataFrame({
+                'merchant': by_merchant.index,
+                'total_spent': by_merchant['sum'].to_numpy(),
+            }).sort_values('total_spent', ascending=False)
+        else:
+            merchants = pd.DataFrame()
+
+        return {
+            'category_summary': category_summary,
+            'monthly_summary': monthly,
+            'category_by_month': category_month,
+            'merchant_totals': merchants,
+            'total_spending': float(round(total, 2)),
+            'transaction_count': len(self.df),
+        }
+
     def get_category_summary(self) -> pd.DataFrame:
         """Get spending summary by category."""
-        category_summary = (
-            self.df.groupby('category', as_index=False)
-            .agg({
-                'amount': ['sum', 'count', 'mean']
-            })
-            .round(2)
-        )
-        
-        category_summary.columns = ['category', 'total_spent', 'transaction_count', 'avg_transaction']
-        category_summary = category_summary.sort_values('total_spent', ascending=False)
-        
-        # Calculate percentage of total
-        total_all = category_summary['total_spent'].sum()
-        category_summary['percentage'] = (category_summary['total_spent'] / total_all * 100).round(1)
-        
-        return category_summary
+        return self.compute_all()['category_summary'].copy()
     
     def get_monthly_summary(self) -> pd.DataFrame:
         """Get monthly spending totals."""
-        if 'year_month' not in self.df.columns:
-            return pd.DataFrame()
-        
-        monthly = (
-            self.df.groupby('year_month', as_index=False)
-            .agg({
-                'amount': ['sum', 'count']
-            })
-            .round(2)
-        )
-        
-        monthly.columns = ['month', 'total_spent', 'transaction_count']
-        monthly = monthly.sort_values('month')
-        
-        return monthly
+        return self.compute_all()['monthly_summary'].copy()
     
     def get_category_by_month(self) -> pd.DataFrame:
         """Get spending by category and month."""
-        if 'year_month' not in self.df.columns or 'category' not in self.df.columns:
-            return pd.DataFrame()
-        
-        category_month = (
-            self.df.groupby(['category', 'year_month'], as_index=False)
-            .agg({'amount': 'sum'})
-            .round(2)
-        )
-        category_month.columns = ['category', 'month', 'total_spent']
-        
-        return category_month
+        return self.compute_all()['category_by_month'].copy()
     
     def get_top_categories(self, n: int = 5) -> pd.DataFrame:
         """Get top N spending categories."""
@@ -90,23 +181,11 @@ class ExpenseAnalytics:
     
     def get_top_merchants(self, n: int = 5) -> pd.DataFrame:
         """Get top N merchants by spending."""
-        if 'merchant' not in self.df.columns:
-            return pd.DataFrame()
-        
-        merchant_summary = (
-            self.df.groupby('merchant', as_index=False)
-            .agg({'amount': 'sum'})
-            .sort_values('amount', ascending=False)
-            .head(n)
-            .round(2)
-        )
-        merchant_summary.columns = ['merchant', 'total_spent']
-        
-        return merchant_summary
+        return self.compute_all()['merchant_totals'].head(n).round(2)
     
     def get_total_spending(self) -> float:
         """Get total spending across all transactions."""
-        return float(self.df['amount'].sum().round(2))
+        return self.compute_all()['total_spending']
     
     def get_transaction_count(self) -> int:
         """Get total number of transactions."""
@@ -132,12 +211,16 @@ class ExpenseAnalytics:
             "-" * 60,
         ]
         
-        # Add category breakdown
-        for _, row in top_categories.iterrows():
-            report_lines.append(
-                f"  {row['category']:20s} ${row['total_spent']:>10,.2f}  "
-                f"({row['percentage']:>5.1f}%)  [{int(row['transaction_count'])} transactions]"
+        # Add category breakdown (columns pulled out once and zipped, no per-row Series)
+        report_lines.extend(
+            f"  {c:20s} ${t:>10,.2f}  ({p:>5.1f}%)  [{int(n)} transactions]"
+            for c, t, p, n in zip(
+                top_categories['category'].tolist(),
+                top_categories['total_spent'].tolist(),
+                top_categories['percentage'].tolist(),
+                top_categories['transaction_count'].tolist(),
             )
+        )
         
         # Add monthly summary if available
         if not monthly_summary.empty:
@@ -146,11 +229,14 @@ class ExpenseAnalytics:
                 "MONTHLY SPENDING SUMMARY:",
                 "-" * 60,
             ])
-            for _, row in monthly_summary.iterrows():
-                report_lines.append(
-                    f"  {row['month']:10s} ${row['total_spent']:>10,.2f}  "
-                    f"[{int(row['transaction_count'])} transactions]"
+            report_lines.extend(
+                f"  {m:10s} ${t:>10,.2f}  [{int(n)} transactions]"
+                for m, t, n in zip(
+                    monthly_summary['month'].tolist(),
+                    monthly_summary['total_spent'].tolist(),
+                    monthly_summary['transaction_count'].tolist(),
                 )
+            )
         
         # Add top merchants if available
         top_merchants = self.get_top_merchants()
@@ -160,10 +246,10 @@ class ExpenseAnalytics:
                 "TOP MERCHANTS BY SPENDING:",
                 "-" * 60,
             ])
-            for _, row in top_merchants.iterrows():
-                report_lines.append(
-                    f"  {row['merchant']:30s} ${row['total_spent']:>10,.2f}"
-                )
+            report_lines.extend(
+                f"  {m:30s} ${t:>10,.2f}"
+                for m, t in zip(top_merchants['merchant'].tolist(), top_merchants['total_spent'].tolist())
+            )
         
         report_lines.extend([
             "",
@@ -0,0 +1,304 @@
+"""
+Shared DataFrame helpers used by the agents.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson  # type: ignore
+except Exception:  # optional: falls back to the stdlib json module
+    orjson = None
+
+_YEAR_MONTH_RE = re.compile(r"(\d{4})-(\d{2})")
+
+# Output files are written through one handle with a large buffer
+WRITE_BUFFER_SIZE = 1 << 20
+
+# pandas.read_csv's default missing-value markers, so both readers agree
+_CSV_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def read_csv(path: Path) -> pd.DataFrame:
+    """
+    Read a transactions CSV, using pyarrow's multi-threaded parser when installed.
+
+    The result matches pandas.read_csv: the same missing-value markers, and
+    `date` (like every other text column) kept as the original strings. If
+    pyarrow would infer any other column as a date/time, pandas is used instead.
+    """
+    try:
+        import pyarrow as pa  # type: ignore
+        from pyarrow import csv as pacsv  # type: ignore
+    except Exception:
+        return pd.read_csv(path)
+
+    convert = pacsv.ConvertOptions(
+        column_types={"date": pa.string()},
+        null_values=_CSV_NA_VALUES,
+        strings_can_be_null=True,
+    )
+    try:
+        table = pacsv.read_csv(path, convert_options=convert)
+    except Exception:
+        return pd.read_csv(path)
+    if any(pa.types.is_temporal(field.type) for field in table.schema):
+        return pd.read_csv(path)
+    # All-empty columns come back as Arrow nulls; pandas reads them as float NaN
+    if any(pa.types.is_null(field.type) for field in table.schema):
+        table = table.cast(
+            pa.schema(
+                [field.with_type(pa.float64()) if pa.types.is_null(field.type) else field for field in table.schema]
+            )
+        )
+    return table.to_pandas()
+
+
+def write_table(df: pd.DataFrame, path: Path, parquet: bool = False, fast_csv: bool = False) -> Path:
+    """
+    Write `df` to `path` as CSV, or as Parquet (same stem, .parquet) if asked.
+
+    Parquet is columnar, typed and compressed, so it is much smaller and
+    faster to load back than CSV. It needs pyarrow; if that is missing or a
+    column can't be converted, the CSV is written instead. Returns the path
+    actually written.
+
+    With `fast_csv`, the CSV is written by pyarrow's multi-threaded writer.
+    The columns and values are the same, but the text differs from pandas'
+    (strings are always quoted, booleans are lowercase).
+    """
+    if parquet:
+        try:
+            import pyarrow  # type: ignore  # noqa: F401
+
+            out = path.with_suffix(".parquet")
+            df.to_parquet(out, index=False, compression="snappy")
+            return out
+        except Exception:
+            pass
+    if fast_csv:
+        try:
+            import pyarrow as pa  # type: ignore
+            from pyarrow import csv as pacsv  # type: ignore
+
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+            return path
+        except Exception:
+            pass
+    with open(path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        df.to_csv(f, index=False)
+    return path
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    # Straight to the file descriptor: the payload is already one bytes
+    # object, so a buffered file object would only add a copy and setup.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def write_text(text: str, path: Path) -> Path:
+    """Write `text` to `path` as UTF-8 (like Path.write_text) through one buffered handle."""
+    with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(text)
+    return path
+
+
+def _json_default(obj: Any) -> Any:
+    # numpy scalars/arrays, which orjson serializes natively
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_json_bytes(obj: Any, indent: bool) -> bytes | None:
+    if orjson is None:
+        return None
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    try:
+        return orjson.dumps(obj, option=option)
+    except TypeError:
+        return None  # a type orjson doesn't know; let the stdlib try
+
+
+def dumps_json(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize to a JSON string, using orjson when installed.
+
+    orjson is several times faster than json.dumps (especially with
+    indentation) and handles numpy values directly. Non-ASCII text is written
+    as plain UTF-8 rather than escaped; it parses back the same either way.
+    """
+    data = _dumps_json_bytes(obj, indent)
+    if data is not None:
+        return data.decode("utf-8")
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=_json_default)
+
+
+def write_json(obj: Any, path: Path, indent: bool = False) -> Path:
+    """
+    Write dumps_json(obj) to `path` as UTF-8.
+
+    orjson's bytes go straight to the file descriptor (no decode/encode
+    round trip, no file object).
+    """
+    data = _dumps_json_bytes(obj, indent)
+    if data is None:
+        data = dumps_json(obj, indent=indent).encode("utf-8")
+    _write_bytes(path, data)
+    return path
+
+
+def loads_json(text: str | bytes) -> Any:
+    """Parse JSON with orjson when installed; errors are json.JSONDecodeError either way."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def coerce_transactions(df: pd.DataFrame, dropna: bool = True, parse_dates: bool = True) -> pd.DataFrame:
+    """
+    Return a shallow copy of `df` with a numeric `amount` (and datetime `date`).
+
+    Columns that already have the right dtype are reused instead of being
+    re-parsed, so calling this on an already-prepared frame is cheap. New
+    columns are assigned on the copy; the caller's frame is never mutated.
+
+    Args:
+        df: Transactions DataFrame
+        dropna: Drop rows whose amount (or date) is missing/invalid
+        parse_dates: Also coerce the `date` column
+    """
+    out = df.copy(deep=False)
+
+    amount = out.get("amount")
+    if amount is None or not pd.api.types.is_numeric_dtype(amount):
+        out["amount"] = pd.to_numeric(amount, errors="coerce")
+
+    subset = ["amount"]
+    if parse_dates:
+        date = out.get("date")
+        if date is None or not pd.api.types.is_datetime64_any_dtype(date):
+            out["date"] = pd.to_datetime(date, errors="coerce")
+        subset.append("date")
+
+    if dropna:
+        out = out.dropna(subset=subset)
+    return out
+
+
+def map_unique(values: pd.Series, func: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Apply a vectorized Series transform to the distinct values of `values` only.
+
+    Merchant-like columns have far fewer distinct values than rows, so string
+    work (lower/regex) runs once per distinct value and is broadcast back by
+    integer code. The result is aligned to `values.index`.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = func(pd.Series(uniques))
+    return mapped.take(codes).set_axis(values.index)
+
+
+def frame_fingerprint(df: pd.DataFrame, columns: list[str] | None = None) -> bytes | None:
+    """
+    Content hash of `df` (or just `columns`, where present), for caching derived results.
+
+    Covers values, index and column names; None if some column can't be hashed.
+    """
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    try:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return h.digest()
+    except Exception:
+        return None
+
+
+def contains_text(values: pd.Series, text: str) -> np.ndarray:
+    """
+    Boolean array: which values contain `text` as a literal substring (missing -> False).
+
+    String-dtype columns are searched as-is (no astype(str) copy). The needle
+    stays a plain str rather than a compiled re: pandas can only hand plain
+    patterns to the Arrow string kernels, and a literal search beats any regex.
+    """
+    if not pd.api.types.is_string_dtype(values):
+        values = values.astype(str)
+    return values.str.contains(text, regex=False, na=False).to_numpy(dtype=bool)
+
+
+def true_mask(values: pd.Series) -> np.ndarray:
+    """
+    Boolean array: which values are True (missing -> False), like `values == True`.
+
+    Boolean columns (numpy, nullable or Arrow-backed) are converted straight to
+    a numpy mask; only object columns fall back to the element-wise comparison.
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values.to_numpy() == True, dtype=bool)  # noqa: E712
+
+
+def year_month_key(dates: pd.Series) -> np.ndarray:
+    """
+    Integer month keys (year * 100 + month, e.g. 202502) for a datetime Series.
+
+    Grouping and comparing on int32 keys is much cheaper than on "YYYY-MM"
+    strings; use format_year_month() when a key needs to be displayed.
+    """
+    return dates.dt.year.to_numpy(dtype=np.int32) * 100 + dates.dt.month.to_numpy(dtype=np.int32)
+
+
+def format_year_month(key: int) -> str:
+    """Render a year_month_key() value as "YYYY-MM"."""
+    return f"{int(key) // 100:04d}-{int(key) % 100:02d}"
+
+
+def parse_year_month(text: str) -> int | None:
+    """Parse a "YYYY-MM" string into a year_month_key() value (None if malformed)."""
+    m = _YEAR_MONTH_RE.fullmatch(text)
+    return int(m.group(1)) * 100 + int(m.group(2)) if m else None
+
+
+def shift_year_month(key: int, months: int) -> int:
+    """Move a year_month_key() value by a number of months, carrying into the year."""
+    y, m0 = divmod(int(key) // 100 * 12 + int(key) % 100 - 1 + months, 12)
+    return y * 100 + m0 + 1
+
+
+def prepare_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    coerce_transactions() plus the columns the monthly agents share.
+
+    Guarantees a `category` column (missing -> "Uncategorized") and adds an
+    integer `year_month` key (see year_month_key()).
+    """
+    out = coerce_transactions(df)
+    if "category" not in out.columns:
+        out["category"] = "Uncategorized"
+    out["year_month"] = year_month_key(out["date"])
+    return out
@@ -0,0 +1,117 @@
+import functools
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make `src/` importable (agents.*, utils.*) for every test module, once.
+SRC_DIR = str(Path(__file__).absolute().parents[1] / "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+CATEGORIES = ["Groceries", "Dining", "Shopping", "Uncategorized"]
+
+
+# Shared input frames, built once per session with already-typed columns
+# (parsed dates, float amounts, categorical categories). pandas and numpy are
+# imported by the fixtures, so collecting tests that use none of them (or
+# running `pytest -k categoriz`) doesn't pay for the import here.
+
+
+@functools.cache
+def _pandas():
+    import pandas as pd
+
+    # The frames are shared by every test, so an agent writing to its input
+    # must never reach them. pandas >= 3 is always copy-on-write (and
+    # deprecates the option); on 2.x turn it on for the same guarantee
+    # without defensive copies.
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+    return pd
+
+
+@pytest.fixture(scope="session")
+def forecast_df():
+    import numpy as np
+
+    pd = _pandas()
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2026-01-05", "2026-01-20", "2026-02-03", "2026-02-14"], format="%Y-%m-%d"),
+            "amount": np.array([10, 20, 15, 25], dtype=np.float64),
+            "category": pd.Categorical(["Groceries", "Groceries", "Dining", "Dining"], categories=CATEGORIES),
+            "description": ["A", "B", "C", "D"],
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def forecast_zero_df():
+    import numpy as np
+
+    pd = _pandas()
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2026-01-01"], format="%Y-%m-%d"),
+            "amount": np.array([0.0], dtype=np.float64),
+            "category": pd.Categorical(["Groceries"], categories=CATEGORIES),
+            "description": ["A"],
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def rec_df():
+    import numpy as np
+
+    pd = _pandas()
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(
+                ["2026-01-01", "2026-01-15", "2026-01-20", "2026-01-25", "2026-01-28", "2026-01-29", "2026-01-30"],
+                format="%Y-%m-%d",
+            ),
+            "amount": np.array([99.0, 25.0, 25.0, 25.0, 12.0, 12.0, 500.0], dtype=np.float64),
+            "category": pd.Categorical(
+                ["Shopping", "Dining", "Dining", "Dining", "Uncategorized", "Uncategorized", "Shopping"],
+                categories=CATEGORIES,
+            ),
+            "description": np.array(
+                ["Amazon", "Restaurant", "Restaurant", "Restaurant", "Unknown", "Unknown2", "Big Purchase"], dtype=object
+            ),
+            "tags": np.array(["", "recurring", "recurring", "recurring", "", "", ""], dtype=object),
+            "is_anomaly": np.array([False] * 6 + [True], dtype=bool),
+        }
+    )
+
+
+# Agents, created once per test module and shared by its tests.
+
+
+@pytest.fixture(scope="module")
+def disabled_llm_agent():
+    from agents.llm_categorization_agent import LLMCategorizationAgent
+
+    return LLMCategorizationAgent(enabled=False)
+
+
+@pytest.fixture(scope="module")
+def forecast_agent_2mo():
+    from agents.forecasting_agent import ForecastingAgent, ForecastConfig
+
+    return ForecastingAgent(config=ForecastConfig(months_ahead=2, granularity="category"))
+
+
+@pytest.fixture(scope="module")
+def forecast_agent_3mo():
+    from agents.forecasting_agent import ForecastingAgent, ForecastConfig
+
+    return ForecastingAgent(config=ForecastConfig(months_ahead=3, granularity="category"))
+
+
+@pytest.fixture(scope="module")
+def offline_rec_agent():
+    from agents.recommendation_agent import RecommendationAgent
+
+    return RecommendationAgent(enabled=False)
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+
+from agents.anomaly_detection_agent import (
+    REASON_CATEGORY,
+    REASON_LARGE,
+    REASON_MERCHANT,
+    REASON_STAT,
+    AnomalyDetectionAgent,
+)
+
+
+@pytest.fixture(scope="module")
+def anomaly_agent():
+    return AnomalyDetectionAgent()
+
+
+def _frame(merchants, amounts, categories):
+    return pd.DataFrame(
+        {
+            "date": [f"2026-01-{day:02d}" for day in range(1, len(amounts) + 1)],
+            "merchant": merchants,
+            "amount": amounts,
+            "category": categories,
+        }
+    )
+
+
+def _flagged(out):
+    """{row position: (reason, score)} for the flagged rows."""
+    flagged = out["is_anomaly"].to_numpy()
+    return {
+        int(i): (reason, pytest.approx(score, abs=1e-6))
+        for i, reason, score in zip(
+            flagged.nonzero()[0], out["anomaly_reason"][flagged], out["anomaly_score"][flagged]
+        )
+    }
+
+
+def test_sample_data_iqr_and_merchant_flags(anomaly_agent):
+    # data/raw/transactions.csv
+    merchants = [
+        "Starbucks", "Uber", "Netflix", "Whole Foods", "Shell Gas", "Amazon", "Spotify", "Target",
+        "Apple Store", "McDonald's", "Dunkin'", "Airbnb", "Costco", "Unknown Merchant", "Square",
+    ]
+    amounts = [6.45, 22.10, 15.99, 124.50, 45.30, 89.99, 9.99, 56.75, 199.00, 8.25, 4.50, 250.00, 78.20, 42.00, 15.75]
+    out = anomaly_agent.detect_anomalies(_frame(merchants, amounts, ["Uncategorized"] * len(amounts)))
+
+    assert _flagged(out) == {
+        8: ("IQR outlier: Amount $199.00 outside range [$-93.97, $190.93]", 0.113268),
+        11: ("IQR outlier: Amount $250.00 outside range [$-93.97, $190.93]", 0.829309),
+        13: ("Unknown/suspicious merchant: 'Unknown Merchant'", 1.0),
+        14: ("Unknown/suspicious merchant: 'Square'", 1.0),
+    }
+    assert (out["anomaly_score"][~out["is_anomaly"]] == 0).all()
+    assert (out["anomaly_reason"][~out["is_anomaly"]] == "").all()
+
+
+def test_statistical_outlier(anomaly_agent):
+    out = anomaly_agent.detect_anomalies(
+        _frame(["Shop"] * 11, [10.0] * 10 + [1000.0], ["Shopping"] * 10 + ["Travel"])
+    )
+    assert _flagged(out) == {
+        10: ("Statistical outlier: Z-score 3.02 (amount $1000.00 vs mean $100.00)", 3.015113),
+    }
+
+
+def test_category_outlier_within_an_unremarkable_overall_range(anomaly_agent):
+    out = anomaly_agent.detect_anomalies(
+        _frame(
+            ["Cafe"] * 7 + ["Store"] * 4,
+            [10.0] * 6 + [20.0] + [5.0, 30.0, 40.0, 15.0],
+            ["Dining"] * 7 + ["Shopping"] * 4,
+        )
+    )
+    assert _flagged(out) == {
+        6: ("Category outlier: $20.00 in 'Dining' (category avg: $11.43)", 2.267787),
+        8: ("IQR outlier: Amount $30.00 outside range [$-1.25, $28.75]", 0.166667),
+        9: ("IQR outlier: Amount $40.00 outside range [$-1.25, $28.75]", 1.5),
+    }
+
+
+def test_large_transaction(anomaly_agent):
+    # Zero IQR and a z-score under the threshold: only the 5x-median rule fires
+    out = anomaly_agent.detect_anomalies(_frame(["Shop"] * 5, [10.0] * 4 + [60.0], ["Shopping"] * 5))
+    assert _flagged(out) == {
+        4: ("Unusually large transaction: $60.00 (>50.00, median: $10.00)", 6.0),
+    }
+
+
+def test_summary_counts_each_anomaly_under_its_first_detector(anomaly_agent):
+    # Row 9 trips the z-score, category, merchant and large-transaction
+    # detectors; row 10 only the merchant one.
+    out = anomaly_agent.detect_anomalies(
+        _frame(["Coffee Shop"] * 9 + ["Unknown Merchant", "Square"], [10.0] * 9 + [1000.0, 10.0], ["Dining"] * 11)
+    )
+
+    every_detector = REASON_STAT | REASON_CATEGORY | REASON_MERCHANT | REASON_LARGE
+    assert out["reason_mask"].tolist()[9:] == [every_detector, REASON_MERCHANT]
+    assert out["anomaly_reason"].iloc[9].startswith("Statistical outlier")
+
+    summary = anomaly_agent.get_anomaly_summary(out)
+    assert summary["total_anomalies"] == 2
+    assert summary["anomalies_by_type"] == {"Statistical Outlier": 1, "Unknown Merchant": 1}
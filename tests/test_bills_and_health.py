@@ -1,48 +1,51 @@
-import unittest
-import sys
-from pathlib import Path
-
 import pandas as pd
 
-SRC_DIR = Path(__file__).resolve().parents[1] / "src"
-if str(SRC_DIR) not in sys.path:
-    sys.path.insert(0, str(SRC_DIR))
-
-from agents.bill_agent import BillAgent  # noqa: E402
-from agents.health_agent import FinancialHealthAgent  # noqa: E402
-
-
-class TestBillsAndHealth(unittest.TestCase):
-    def test_bill_agent_marks_recurring(self):
-        df = pd.DataFrame(
-            [
-                {"date": "2025-11-01", "amount": 9.99, "merchant": "Netflix", "description": "Netflix"},
-                {"date": "2025-12-01", "amount": 9.99, "merchant": "Netflix", "description": "Netflix"},
-                {"date": "2026-01-01", "amount": 9.99, "merchant": "Netflix", "description": "Netflix"},
-                {"date": "2026-01-15", "amount": 40.0, "merchant": "Grocery", "description": "Food"},
-            ]
-        )
-        agent = BillAgent()
-        out = agent.mark_recurring(df)
-        self.assertIn("is_recurring", out.columns)
-        self.assertGreaterEqual(int((out["is_recurring"] == True).sum()), 1)  # noqa: E712
-
-    def test_health_agent_returns_score_range(self):
-        df = pd.DataFrame(
-            [
-                {"date": "2026-01-01", "amount": 100.0, "category": "Groceries"},
-                {"date": "2026-01-15", "amount": 50.0, "category": "Dining"},
-                {"date": "2026-02-01", "amount": 110.0, "category": "Groceries"},
-                {"date": "2026-02-15", "amount": 60.0, "category": "Dining"},
-            ]
-        )
-        agent = FinancialHealthAgent()
-        res = agent.calculate(df, budget_status=None)
-        self.assertIn("score", res)
-        self.assertGreaterEqual(res["score"], 0)
-        self.assertLessEqual(res["score"], 100)
-
-
-if __name__ == "__main__":
-    unittest.main()
-
+from agents.bill_agent import BillAgent
+from agents.budget_agent import BudgetAgent
+from agents.health_agent import FinancialHealthAgent
+
+
+def test_bill_agent_marks_recurring():
+    records = [
+        ("2025-11-01", 9.99, "Netflix", "Netflix"),
+        ("2025-12-01", 9.99, "Netflix", "Netflix"),
+        ("2026-01-01", 9.99, "Netflix", "Netflix"),
+        ("2026-01-15", 40.0, "Grocery", "Food"),
+    ]
+    df = pd.DataFrame.from_records(records, columns=["date", "amount", "merchant", "description"]).astype(
+        {"amount": "float64"}
+    )
+    agent = BillAgent()
+    out = agent.mark_recurring(df)
+    assert "is_recurring" in out.columns
+    assert int((out["is_recurring"] == True).sum()) >= 1  # noqa: E712
+
+
+def test_health_agent_returns_score_range():
+    records = [
+        ("2026-01-01", 100.0, "Groceries"),
+        ("2026-01-15", 50.0, "Dining"),
+        ("2026-02-01", 110.0, "Groceries"),
+        ("2026-02-15", 60.0, "Dining"),
+    ]
+    df = pd.DataFrame.from_records(records, columns=["date", "amount", "category"]).astype(
+        {"amount": "float64", "category": "category"}
+    )
+    agent = FinancialHealthAgent()
+    res = agent.calculate(df, budget_status=None)
+    assert "score" in res
+    assert res["score"] >= 0
+    assert res["score"] <= 100
+
+
+def test_budget_status_months_are_plain_strings():
+    records = [
+        ("2026-02-10", 80.0, "Groceries"),
+        ("2026-03-02", 45.0, "Groceries"),
+        ("2026-03-20", 30.0, "Dining"),
+    ]
+    df = pd.DataFrame.from_records(records, columns=["date", "amount", "category"])
+    status = BudgetAgent().budget_status(df, {"Groceries": 100.0, "Dining": 50.0})
+    months = [status["overall"]["month"], *(c["month"] for c in status["categories"])]
+    assert months == ["2026-03"] * 3
+    assert all(type(m) is str for m in months)
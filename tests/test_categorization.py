@@ -1,31 +1,116 @@
-import unittest
-import sys
-from pathlib import Path
+import asyncio
+from types import MappingProxyType
 
-SRC_DIR = Path(__file__).resolve().parents[1] / "src"
-if str(SRC_DIR) not in sys.path:
-    sys.path.insert(0, str(SRC_DIR))
+import pandas as pd
+import pytest
 
-from agents.llm_categorization_agent import LLMCategorizationAgent  # noqa: E402
-from agents.routing import route_transaction  # noqa: E402
+from agents.categorization_agent import CATEGORY_RULES, CategorizationAgent, match_category
+from agents.merchant_dictionary import _pattern, lookup
+from agents.routing import route_frame, route_transaction, route_transactions
 
+# Read-only so a routing function that mutates its inputs fails loudly
+_LOW_CONFIDENCE_RULE = MappingProxyType({"category": "Dining", "confidence": 0.2, "reason": "low"})
+_RESTAURANT_TX = MappingProxyType({"description": "Restaurant", "amount": 10, "date": "2026-01-01"})
 
-class TestCategorizationRouting(unittest.TestCase):
-    def test_llm_agent_disabled_returns_uncategorized(self):
-        agent = LLMCategorizationAgent(enabled=False)
-        out = agent.categorize({"description": "Test", "amount": 10, "date": "2026-01-01"})
-        self.assertEqual(out["category"], "Uncategorized")
-        self.assertEqual(out["confidence"], 0.0)
 
-    def test_route_transaction_falls_back_when_no_llm(self):
-        rule_result = {"category": "Dining", "confidence": 0.2, "reason": "low"}
-        tx = {"description": "Restaurant", "amount": 10, "date": "2026-01-01"}
-        agent = LLMCategorizationAgent(enabled=False)
-        out = route_transaction(rule_result=rule_result, transaction=tx, llm_agent=agent)
-        self.assertEqual(out["source"], "rule_no_llm")
-        self.assertEqual(out["category"], "Dining")
+@pytest.fixture(scope="module")
+def rule_agent():
+    return CategorizationAgent()
 
 
-if __name__ == "__main__":
-    unittest.main()
+def test_llm_agent_disabled_returns_uncategorized(disabled_llm_agent):
+    out = disabled_llm_agent.categorize({"description": "Test", "amount": 10, "date": "2026-01-01"})
+    assert out["category"] == "Uncategorized"
+    assert out["confidence"] == 0.0
 
+
+def test_route_transaction_falls_back_when_no_llm(disabled_llm_agent):
+    out = route_transaction(
+        rule_result=_LOW_CONFIDENCE_RULE, transaction=_RESTAURANT_TX, llm_agent=disabled_llm_agent
+    )
+    assert out["source"] == "rule_no_llm"
+    assert out["category"] == "Dining"
+
+
+def test_first_matching_rule_wins(rule_agent):
+    # "uber" appears first in the string, but Food is earlier in the rule table
+    out = rule_agent.categorize({"merchant": "Uber Eats Restaurant"})
+    assert out["category"] == "Food"
+    assert out["confidence"] == 0.9
+
+
+def test_no_match_is_low_confidence(rule_agent):
+    out = rule_agent.categorize({"merchant": "Corner Store"})
+    assert out["category"] == "Uncategorized"
+    assert out["confidence"] == 0.3
+
+
+def test_match_category_follows_the_rule_table():
+    def first_rule(merchant):
+        for category, keywords in CATEGORY_RULES.items():
+            if any(k in merchant for k in keywords):
+                return category
+        return None
+
+    keywords = [k for ks in CATEGORY_RULES.values() for k in ks]
+    merchants = ["", "corner store", "x\nnetflix", *keywords, *(f"{a} {b}" for a in keywords for b in keywords)]
+    assert [match_category(m) for m in merchants] == [first_rule(m) for m in merchants]
+
+
+def test_categorize_df_matches_scalar_path(rule_agent):
+    txns = [{"merchant": m} for m in ("Uber Eats Restaurant", "Netflix", "Corner Store", "Shell Oil")]
+    out = rule_agent.categorize_df(pd.DataFrame(txns))
+    assert out.to_dict(orient="records") == [rule_agent.categorize(t) for t in txns]
+
+
+def test_merchant_dictionary_prefers_the_longest_overlapping_key():
+    assert _pattern(["amazon", "amazon prime"]).search("amazon prime video ").group(0) == "amazon prime"
+    assert lookup({"merchant": "Uber Eats", "description": "Dinner"})["category"] == "Dining"
+    assert lookup({"merchant": "Uber", "description": "Ride home"})["category"] == "Transportation"
+
+
+def test_merchant_dictionary_keys_must_start_a_word():
+    assert lookup({"merchant": "Rent Co LLC"})["category"] == "Rent"
+    assert lookup({"merchant": "Parent Teacher Assoc", "description": "Apparently fine"}) is None
+    assert lookup({"merchant": "BPX Holdings"}) is None  # "bp " must also end at a word end
+    assert lookup({"merchant": "BP", "description": "Fuel"})["source"] == "merchant_dict"
+
+
+class _StubLLMAgent:
+    def __init__(self):
+        self.asked = []
+
+    def categorize(self, transaction):
+        self.asked.append(transaction["description"])
+        return {"category": "Shopping", "confidence": 0.8, "reason": "stub"}
+
+
+def test_route_transactions_settles_known_merchants_without_the_llm():
+    llm_agent = _StubLLMAgent()
+    transactions = [
+        {"merchant": "Uber Eats", "description": "Dinner"},
+        {"merchant": "Corner Store", "description": "Snacks"},
+    ]
+    low = {"category": "Uncategorized", "confidence": 0.3, "reason": "No matching keyword rules"}
+    out = asyncio.run(route_transactions([low, low], transactions, llm_agent))
+
+    assert llm_agent.asked == ["Snacks"]
+    assert [(r["category"], r["source"]) for r in out] == [("Dining", "merchant_dict"), ("Shopping", "llm")]
+    assert out[0]["rule_confidence"] == 0.3
+
+
+def test_route_frame_matches_route_transaction_with_llm_disabled(rule_agent, disabled_llm_agent):
+    transactions_df = pd.DataFrame(
+        {
+            "merchant": ["Uber Eats Restaurant", "Netflix", "Corner Store", "Shell Oil", "Mystery Co"],
+            "description": ["Dinner", "Monthly", "Snacks", "Fuel", "Something"],
+        }
+    )
+    rule_df = rule_agent.categorize_df(transactions_df)
+    out = asyncio.run(route_frame(rule_df, transactions_df, disabled_llm_agent))
+
+    expected = [
+        route_transaction(rule_result=r, transaction=t, llm_agent=disabled_llm_agent)
+        for r, t in zip(rule_df.to_dict(orient="records"), transactions_df.to_dict(orient="records"))
+    ]
+    assert out.to_dict(orient="records") == expected
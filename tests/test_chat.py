@@ -0,0 +1,97 @@
+import weakref
+
+import pandas as pd
+import pytest
+
+from agents.chat_agent import ChatAgent
+
+
+@pytest.fixture
+def chat_agent():
+    return ChatAgent(enabled=False)
+
+
+def _frame(amounts):
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2026-01-05", "2026-01-20"], format="%Y-%m-%d"),
+            "amount": amounts,
+            "category": ["Groceries", "Dining"],
+            "description": ["A", "B"],
+        }
+    )
+
+
+def test_prepared_frame_tracks_in_place_edits(chat_agent):
+    df = _frame([10.0, 200.0])
+    assert "(1 found)" in chat_agent.query("transactions over $100", df).answer
+    assert "(1 found)" in chat_agent.query("transactions over $100", df).answer
+
+    df.loc[0, "amount"] = 1000.0
+    assert "(2 found)" in chat_agent.query("transactions over $100", df).answer
+
+
+def test_prepared_frame_registers_one_finalizer_per_frame(chat_agent, monkeypatch):
+    registered = []
+    finalize = weakref.finalize
+    monkeypatch.setattr(weakref, "finalize", lambda obj, *args: registered.append(finalize(obj, *args)))
+
+    df = _frame([10.0, 200.0])
+    for amount in (300.0, 400.0, 500.0):
+        df.loc[0, "amount"] = amount
+        chat_agent.query("transactions over $100", df)
+    assert len(registered) == 1
+    assert len(chat_agent._prepared) == 1
+
+    del df
+    assert chat_agent._prepared == {}
+
+
+class _StubCompletions:
+    """chat.completions stand-in: echoes the question, raises for "boom" ones."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages):
+        self.calls += 1
+        question = messages[0]["content"].split("Question: ", 1)[1].split("\n", 1)[0]
+        if "boom" in question:
+            raise ValueError("stub failure")
+        message = type("Message", (), {"content": f"answer to {question}"})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+@pytest.fixture
+def llm_chat_agent():
+    agent = ChatAgent(enabled=False)
+    completions = _StubCompletions()
+    agent._client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})})
+    return agent, completions
+
+
+def test_query_many_keeps_order_and_isolates_failures(llm_chat_agent):
+    agent, _ = llm_chat_agent
+    questions = ["what about rent?", "transactions over $100", "boom question", "what about travel?"]
+    answers = agent.query_many(questions, _frame([10.0, 200.0]), max_workers=4)
+
+    assert [a.answer for a in answers] == [
+        "answer to what about rent?",
+        "Here are transactions over **$100.00** (1 found).",
+        "I couldn't answer that right now (LLM error).",
+        "answer to what about travel?",
+    ]
+
+
+def test_answer_cache_is_bounded(llm_chat_agent, monkeypatch):
+    agent, completions = llm_chat_agent
+    monkeypatch.setattr("agents.chat_agent.ANSWER_CACHE_MAX_ENTRIES", 2)
+    df = _frame([10.0, 200.0])
+
+    for question in ("q1?", "q2?", "q1?", "q3?"):
+        agent.query(question, df)
+    assert completions.calls == 3  # the repeated q1 was served from the cache
+    assert len(agent._answer_cache) == 2
+
+    agent.query("q2?", df)  # least recently used, so evicted by q3
+    assert completions.calls == 4
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from agents.bill_agent import BillAgent
+from agents.enrichment_agent import EnrichmentAgent
+
+
+def test_merchant_normalized_keeps_spaces_and_drops_company_suffixes():
+    df = pd.DataFrame(
+        {
+            "date": ["2026-01-01", "2026-01-02", "2026-01-03", "2026-01-04"],
+            "amount": [124.5, 1500.0, 199.0, 12.0],
+            "merchant": ["Whole Foods", "Rent Co LLC", "Apple  Store", "Cocoa Corp., Inc."],
+            "description": ["Groceries", "Rent", "Headphones", "Snacks"],
+        }
+    )
+    out = EnrichmentAgent().enrich_dataframe(df)
+    assert out["merchant_normalized"].tolist() == ["whole foods", "rent", "apple store", "cocoa"]
+
+
+def test_bill_agent_groups_on_space_preserving_merchant_names():
+    df = pd.DataFrame(
+        {
+            "date": ["2026-01-01", "2026-02-01", "2026-03-01"],
+            "amount": [9.99, 9.99, 9.99],
+            "merchant": ["Whole Foods", "Whole  Foods!", "whole foods"],
+        }
+    )
+    out = BillAgent()._prepare(df)
+    assert out["merchant_normalized"].tolist() == ["whole foods"] * 3
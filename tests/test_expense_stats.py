@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from tools.expense_stats import ExpenseAnalytics
+
+
+@pytest.fixture
+def multi_month_df():
+    return pd.DataFrame(
+        {
+            "date": [
+                "2025-12-03", "2025-12-19", "2026-01-05", "2026-01-20", "2026-01-28",
+                "2026-02-03", "2026-02-14", "2026-02-27", "not a date",
+            ],
+            "amount": [12.5, 80.0, 45.25, 9.99, 120.0, 33.0, 9.99, 61.4, 7.0],
+            "category": [
+                "Dining", "Groceries", "Groceries", "Entertainment", "Shopping",
+                "Dining", "Entertainment", "Groceries", "Dining",
+            ],
+            "merchant": ["Cafe", "Grocer", "Grocer", "Netflix", "Store", "Cafe", "Netflix", "Grocer", "Cafe"],
+        }
+    )
+
+
+def _reference_summaries(df):
+    """The per-summary groupbys compute_all() replaced, one pass per summary."""
+    df = df.assign(amount=pd.to_numeric(df["amount"], errors="coerce"))
+    df["year_month"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m")
+
+    category = df.groupby("category", as_index=False).agg({"amount": ["sum", "count", "mean"]}).round(2)
+    category.columns = ["category", "total_spent", "transaction_count", "avg_transaction"]
+    category = category.sort_values("total_spent", ascending=False)
+    category["percentage"] = (category["total_spent"] / category["total_spent"].sum() * 100).round(1)
+
+    monthly = df.groupby("year_month", as_index=False).agg({"amount": ["sum", "count"]}).round(2)
+    monthly.columns = ["month", "total_spent", "transaction_count"]
+
+    category_month = df.groupby(["category", "year_month"], as_index=False).agg({"amount": "sum"}).round(2)
+    category_month.columns = ["category", "month", "total_spent"]
+
+    merchants = df.groupby("merchant", as_index=False).agg({"amount": "sum"}).sort_values("amount", ascending=False)
+    merchants.columns = ["merchant", "total_spent"]
+
+    return {
+        "category_summary": category,
+        "monthly_summary": monthly.sort_values("month"),
+        "category_by_month": category_month,
+        "merchant_totals": merchants,
+        "total_spending": float(df["amount"].sum().round(2)),
+        "transaction_count": len(df),
+    }
+
+
+def _assert_same_rows(actual, expected, sort_by=None):
+    if sort_by:
+        actual, expected = actual.sort_values(sort_by), expected.sort_values(sort_by)
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_compute_all_matches_per_summary_groupbys(multi_month_df):
+    summaries = ExpenseAnalytics(multi_month_df).compute_all()
+    expected = _reference_summaries(multi_month_df)
+
+    _assert_same_rows(summaries["category_summary"], expected["category_summary"])
+    # int year*100+month keys render as the same "YYYY-MM" labels; the bad date is left out
+    _assert_same_rows(summaries["monthly_summary"], expected["monthly_summary"])
+    assert summaries["monthly_summary"]["month"].tolist() == ["2025-12", "2026-01", "2026-02"]
+    _assert_same_rows(summaries["category_by_month"], expected["category_by_month"], ["category", "month"])
+    _assert_same_rows(summaries["merchant_totals"], expected["merchant_totals"])
+    assert summaries["total_spending"] == expected["total_spending"]
+    assert summaries["transaction_count"] == expected["transaction_count"]
+
+
+def test_summaries_for_reuses_results_but_hands_out_copies(multi_month_df, monkeypatch):
+    passes = []
+    compute = ExpenseAnalytics._compute_summaries
+    monkeypatch.setattr(ExpenseAnalytics, "_compute_summaries", lambda self: passes.append(1) or compute(self))
+    monkeypatch.setattr("tools.expense_stats._SUMMARY_CACHE", {})
+
+    first = ExpenseAnalytics.summaries_for(multi_month_df)
+    first["category_summary"].loc[:, "total_spent"] = 0.0
+    first["monthly_summary"].drop(first["monthly_summary"].index, inplace=True)
+
+    second = ExpenseAnalytics.summaries_for(multi_month_df.copy())
+    _assert_same_rows(second["category_summary"], _reference_summaries(multi_month_df)["category_summary"])
+    assert len(second["monthly_summary"]) == 3
+    assert len(passes) == 1  # same content, so the second call was a cache hit
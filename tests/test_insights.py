@@ -0,0 +1,20 @@
+from agents.insights_agent import InsightsAgent
+from tools.expense_stats import ExpenseAnalytics
+
+
+def test_basic_insights_cached_on_the_columns_they_read(rec_df, monkeypatch):
+    passes = []
+    compute = ExpenseAnalytics.compute_all
+    monkeypatch.setattr(ExpenseAnalytics, "compute_all", lambda self: passes.append(1) or compute(self))
+    agent = InsightsAgent(enabled=False)
+
+    first = agent.generate_insights(rec_df)
+    assert agent.generate_insights(rec_df.assign(description="edited")) == first
+    assert len(passes) == 1  # description isn't read, so still a hit
+
+    first["insights"] = []  # callers may rewrite top-level keys of their copy
+    assert agent.generate_insights(rec_df)["insights"]
+
+    retagged = agent.generate_insights(rec_df.assign(tags=""))
+    assert len(passes) == 2
+    assert not any(i["type"] == "recurring" for i in retagged["insights"])
@@ -0,0 +1,243 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import agents.llm_categorization_agent as llm
+from agents.llm_categorization_agent import LLMCategorizationAgent, amount_bucket, cache_key, merchant_key
+
+
+def _reply_for(request):
+    """Stub model: categorizes every transaction as Dining, echoing its description."""
+    prompt = request["messages"][-1]["content"]
+    if request["response_format"] == llm.RESPONSE_FORMAT:
+        description = prompt.split('Description: "', 1)[1].split('"', 1)[0]
+        return {"category": "Dining", "confidence": 0.9, "reason": f"stub {description}"}
+    rows = json.loads(prompt.split("):\n", 1)[1].split("\n", 1)[0])
+    return {
+        "results": [
+            {"i": row["i"], "category": "Dining", "confidence": 0.9, "reason": f"stub {row['description']}"}
+            for row in rows
+        ]
+    }
+
+
+def _response(data):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(data)))])
+
+
+class _StubCompletions:
+    def __init__(self):
+        self.requests = []
+        self.reply = _reply_for
+
+    def create(self, **request):
+        self.requests.append(request)
+        return _response(self.reply(request))
+
+
+class _StubAsyncCompletions(_StubCompletions):
+    async def create(self, **request):
+        self.requests.append(request)
+        reply = self.reply(request)
+        if isinstance(reply, Exception):
+            raise reply
+        return _response(reply)
+
+
+@pytest.fixture
+def stub_completions(monkeypatch):
+    completions = _StubCompletions()
+    async_completions = _StubAsyncCompletions()
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(
+        llm, "get_async_client", lambda: SimpleNamespace(chat=SimpleNamespace(completions=async_completions))
+    )
+    return completions, async_completions
+
+
+def _tx(description, amount=12.5):
+    return {"description": description, "amount": amount, "date": "2026-01-05"}
+
+
+def test_cache_key_normalizes_description_and_buckets_amount():
+    assert merchant_key("STARBUCKS #1234, Seattle") == "starbucks seattle"
+    assert [amount_bucket(a) for a in (5, -50, 500, 5000, "n/a")] == ["<10", "<100", "<1000", ">=1000", "?"]
+    assert cache_key(_tx("Starbucks #12", 4.5)) == cache_key(_tx("starbucks 99", 9.0)) == "starbucks|<10"
+
+
+def test_cache_key_keeps_descriptions_without_a_merchant_apart():
+    assert merchant_key("Check 1001") == "check 1001"
+    assert cache_key(_tx("Check 1001")) != cache_key(_tx("Check 1002"))
+    assert cache_key(_tx("1234567")) != cache_key(_tx("カフェ"))
+    assert merchant_key("ACH 55102") == "ach 55102"
+
+
+def test_categorize_hits_the_cache_for_repeat_merchants(stub_completions):
+    completions, _ = stub_completions
+    agent = LLMCategorizationAgent(enabled=True)
+
+    first = agent.categorize(_tx("Cafe Luna #1"))
+    assert first == {"category": "Dining", "confidence": 0.9, "reason": "stub Cafe Luna #1"}
+    assert agent.categorize(_tx("CAFE LUNA #2")) == first  # same cache key: no request
+    assert len(completions.requests) == 1
+
+    agent.categorize(_tx("Cafe Luna #1", amount=250))  # different amount bucket
+    assert len(completions.requests) == 2
+
+
+def test_cache_evicts_least_recently_used(stub_completions, monkeypatch):
+    completions, _ = stub_completions
+    monkeypatch.setattr(llm, "CACHE_MAX_ENTRIES", 2)
+    agent = LLMCategorizationAgent(enabled=True)
+
+    for description in ("alpha", "beta", "alpha", "gamma"):
+        agent.categorize(_tx(description))
+    assert list(agent._cache) == [cache_key(_tx("alpha")), cache_key(_tx("gamma"))]
+
+    agent.categorize(_tx("beta"))  # evicted by gamma, so asked again
+    assert len(completions.requests) == 4
+
+
+def test_cache_round_trips_through_cache_path(stub_completions, tmp_path):
+    completions, _ = stub_completions
+    cache_path = tmp_path / "llm_cache.json"
+    agent = LLMCategorizationAgent(enabled=True, cache_path=cache_path)
+    result = agent.categorize(_tx("Cafe Luna"))
+    agent.save_cache()
+
+    reloaded = LLMCategorizationAgent(enabled=True, cache_path=cache_path)
+    assert reloaded.categorize(_tx("Cafe Luna")) == result
+    assert len(completions.requests) == 1
+
+
+def test_cache_file_from_another_model_is_ignored(stub_completions, monkeypatch, tmp_path):
+    completions, _ = stub_completions
+    cache_path = tmp_path / "llm_cache.json"
+    agent = LLMCategorizationAgent(enabled=True, cache_path=cache_path)
+    agent.categorize(_tx("Cafe Luna"))
+    agent.save_cache()
+
+    monkeypatch.setitem(llm._CACHE_HEADER, "model", "another-model")
+    LLMCategorizationAgent(enabled=True, cache_path=cache_path).categorize(_tx("Cafe Luna"))
+    assert len(completions.requests) == 2
+
+
+def test_results_without_a_description_are_not_cached(stub_completions):
+    completions, _ = stub_completions
+    agent = LLMCategorizationAgent(enabled=True)
+    agent.categorize(_tx(""))
+    agent.categorize(_tx(""))
+    assert len(completions.requests) == 2 and not agent._cache
+
+
+def test_categorize_batch_maps_results_by_index(stub_completions, monkeypatch):
+    completions, _ = stub_completions
+    monkeypatch.setattr(llm, "BATCH_SIZE", 3)
+
+    def reply(request):
+        # Results out of order, i=1 missing, i=0 duplicated (the first one wins), i=9 unknown
+        return {
+            "results": [
+                {"i": 2, "category": "Shopping", "confidence": 0.8, "reason": "third"},
+                {"i": 0, "category": "Groceries", "confidence": 0.9, "reason": "first"},
+                {"i": 0, "category": "Rent", "confidence": 0.9, "reason": "duplicate"},
+                {"i": 9, "category": "Rent", "confidence": 0.9, "reason": "unknown index"},
+            ]
+        }
+
+    completions.reply = reply
+    agent = LLMCategorizationAgent(enabled=True)
+    out = agent.categorize_batch([_tx("grocer"), _tx("mystery"), _tx("shop"), _tx("GROCER")])
+
+    assert len(completions.requests) == 1  # the repeated grocer is not resent
+    assert [(r["category"], r["reason"]) for r in out] == [
+        ("Groceries", "first"),
+        ("Uncategorized", "LLM returned invalid JSON"),
+        ("Shopping", "third"),
+        ("Groceries", "first"),
+    ]
+    assert cache_key(_tx("mystery")) not in agent._cache  # failures are not cached
+
+
+def test_categorize_many_puts_request_errors_in_their_slots(stub_completions, monkeypatch):
+    _, async_completions = stub_completions
+    monkeypatch.setattr(llm, "BATCH_SIZE", 2)
+
+    def reply(request):
+        if "broken" in request["messages"][-1]["content"]:
+            return ValueError("request failed")
+        return _reply_for(request)
+
+    async_completions.reply = reply
+    agent = LLMCategorizationAgent(enabled=True)
+    out = asyncio.run(agent.categorize_many([_tx("a one"), _tx("a two"), _tx("broken"), _tx("b two")]))
+
+    assert [r["reason"] for r in out[:2]] == ["stub a one", "stub a two"]
+    assert isinstance(out[2], ValueError) and isinstance(out[3], ValueError)
+
+
+def test_categorize_batch_api_reads_results_and_flags_missing(stub_completions, monkeypatch, tmp_path):
+    uploaded = {}
+
+    def create_file(file, purpose):
+        uploaded["lines"] = [json.loads(line) for line in file[1].decode().splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def content(file_id):
+        lines = []
+        for record in uploaded["lines"]:
+            if "skipped" in record["body"]["messages"][-1]["content"]:
+                continue
+            body = {"choices": [{"message": {"content": json.dumps(_reply_for(record["body"]))}}]}
+            lines.append(json.dumps({"custom_id": record["custom_id"], "response": {"status_code": 200, "body": body}}))
+        return SimpleNamespace(text="\n".join(lines))
+
+    batch = SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out")
+    client = SimpleNamespace(
+        chat=None,
+        files=SimpleNamespace(create=create_file, content=content),
+        batches=SimpleNamespace(create=lambda **kwargs: batch, retrieve=lambda batch_id: batch),
+    )
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+    agent = LLMCategorizationAgent(enabled=True)
+    out = agent.categorize_batch_api([_tx("Cafe Luna"), _tx("skipped shop"), _tx("CAFE LUNA")], tmp_path)
+
+    assert len(uploaded["lines"]) == 2  # duplicate merchant submitted once
+    assert out[0] == out[2] == {"category": "Dining", "confidence": 0.9, "reason": "stub Cafe Luna"}
+    assert isinstance(out[1], RuntimeError)
+
+
+def test_categorize_batch_api_does_not_resend_uploads_after_a_timeout(stub_completions, monkeypatch, tmp_path):
+    import openai
+
+    calls = []
+
+    def create_file(file, purpose):
+        calls.append(purpose)
+        raise openai.APITimeoutError(request=None)  # the upload may or may not have landed
+
+    monkeypatch.setattr("agents._openai_client.time.sleep", lambda seconds: None)
+    client = SimpleNamespace(chat=None, files=SimpleNamespace(create=create_file))
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+    agent = LLMCategorizationAgent(enabled=True)
+
+    with pytest.raises(openai.APITimeoutError):
+        agent.categorize_batch_api([_tx("Cafe Luna")], tmp_path)
+    assert calls == ["batch"]
+
+
+def test_async_client_is_per_event_loop(monkeypatch):
+    import agents._openai_client as openai_client
+
+    monkeypatch.setattr(openai_client, "OPENAI_API_KEY", "test-key")
+
+    async def two_clients():
+        return openai_client.get_async_client(), openai_client.get_async_client()
+
+    first, again = asyncio.run(two_clients())
+    later, _ = asyncio.run(two_clients())
+    assert first is again  # one pool per run
+    assert later is not first  # a closed loop's pool is never reused